@@ -0,0 +1,116 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+
+from .harness import Suite, compare, git_commit, git_dirty
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+def configure_environment(database_url):
+    """Set the env `src` needs at import time, before importing it.
+
+    The benchmarks measure middleware and routing cost rather than the
+    limits themselves, so rate and concurrency limits are lifted.
+    """
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("DATABASE_URL", database_url or "postgresql:///")
+    os.environ.setdefault("RATE_LIMIT_DEFAULT", "1000000000/second")
+    os.environ.setdefault("MAX_IN_FLIGHT", "1000000")
+
+
+async def run(args):
+    configure_environment(args.database_url)
+    from . import bench_asgi, bench_database
+
+    suite = Suite(scale=args.scale, repeat=args.repeat)
+    if "asgi" in args.only:
+        print("== ASGI in-process ==")
+        await bench_asgi.run(suite, args.database_url)
+    if "database" in args.only:
+        if args.database_url:
+            print("== Database ==")
+            await bench_database.run(suite, args.database_url)
+        else:
+            print("Skipping database benchmarks: BENCH_DATABASE_URL not set.")
+
+    # Results from uncommitted code must not pass for the commit's own.
+    name = git_commit() + ("-dirty" if git_dirty() else "")
+    output = Path(args.output or RESULTS_DIR / f"{name}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(suite.report(), indent=2))
+    print(f"Results written to {output}")
+
+
+def run_compare(args):
+    baseline = json.loads(Path(args.baseline).read_text())
+    current = json.loads(Path(args.current).read_text())
+    regressions = compare(baseline, current, args.threshold)
+
+    def label(report):
+        meta = report["meta"]
+        return meta["commit"] + ("-dirty" if meta.get("dirty") else "")
+
+    print(
+        f"Comparing {label(baseline)} -> {label(current)} "
+        f"(threshold {args.threshold:.0%})"
+    )
+    for name, metric, before, after, change, noise in regressions:
+        print(
+            f"REGRESSION {name} {metric}: {before:.3f} -> {after:.3f} "
+            f"({change:+.1%}, noise ±{noise:.1%})"
+        )
+    if not regressions:
+        print("No regressions.")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument(
+        "--only",
+        nargs="+",
+        choices=["asgi", "database"],
+        default=["asgi", "database"],
+    )
+    run_parser.add_argument(
+        "--database-url",
+        default=os.getenv("BENCH_DATABASE_URL"),
+        help="throwaway Postgres to benchmark against (BENCH_DATABASE_URL)",
+    )
+    run_parser.add_argument("--output", help="JSON results path")
+    run_parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="multiply iteration counts, e.g. 0.1 for a quick run",
+    )
+    run_parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="rounds per benchmark; results keep the median",
+    )
+
+    compare_parser = commands.add_parser(
+        "compare", help="flag regressions between two result files"
+    )
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10)
+
+    args = parser.parse_args()
+    if args.command == "run":
+        asyncio.run(run(args))
+    else:
+        sys.exit(run_compare(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+ROUTES = [
+    ("asgi.ping", "GET", "/api/v1/ping/"),
+    ("asgi.ping_no_trailing_slash", "GET", "/api/v1/ping"),
+    ("asgi.not_found", "GET", "/api/v1/missing/"),
+]
+
+
+def request(app, method, path):
+    """Return a coroutine factory that drives one request through `app`."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"benchmark"), (b"accept", b"*/*")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("benchmark", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    async def call():
+        # Middleware mutates the scope (e.g. the trailing slash rewrite).
+        await app(dict(scope), receive, send)
+
+    return call
+
+
+async def run(suite, database_url=None):
+    from src.main import app
+
+    if database_url:
+        from src import database
+
+        # DATABASE_URL may already point elsewhere; only the throwaway
+        # database is benchmarked.
+        database.database_url = database_url
+        await database.initialize(retries=3, delay=1)
+
+        async def select_one():
+            return await database.select("SELECT 1 AS one")
+
+        app.add_api_route("/bench/db/", select_one, methods=["GET"])
+        routes = ROUTES + [("asgi.database_select", "GET", "/bench/db/")]
+    else:
+        routes = ROUTES
+
+    try:
+        for name, method, path in routes:
+            for concurrency in (1, 50):
+                await suite.measure(
+                    f"{name}.c{concurrency}",
+                    request(app, method, path),
+                    iterations=5000,
+                    concurrency=concurrency,
+                )
+    finally:
+        if database_url:
+            await database.close()
@@ -0,0 +1,125 @@
+from src.core.database import Database
+
+ROW_COUNTS = (1, 100, 1000, 10000)
+TABLE = "bench_items"
+
+
+async def setup(db):
+    await db.commit(f"DROP TABLE IF EXISTS {TABLE}")
+    await db.commit(
+        f"""
+        CREATE TABLE {TABLE} (
+            id SERIAL PRIMARY KEY,
+            name TEXT NOT NULL,
+            value INTEGER NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        )
+        """
+    )
+    await db.commit(
+        f"""
+        INSERT INTO {TABLE} (name, value)
+        SELECT 'item-' || n, n FROM generate_series(1, $1) AS n
+        """,
+        [max(ROW_COUNTS)],
+    )
+    await db.commit(f"ANALYZE {TABLE}")
+
+
+async def run(suite, database_url):
+    db = Database(database_url)
+    await db.initialize(retries=3, delay=1)
+    try:
+        await setup(db)
+        await bench_select(suite, db)
+        await bench_commit(suite, db)
+        await bench_transaction(suite, db)
+        await bench_concurrency(suite, db)
+        await bench_pool_contention(suite, db)
+    finally:
+        await db.commit(f"DROP TABLE IF EXISTS {TABLE}")
+        await db.close()
+
+
+async def bench_select(suite, db):
+    query = f"SELECT * FROM {TABLE} ORDER BY id LIMIT $1"
+    for rows in ROW_COUNTS:
+        await suite.measure(
+            f"database.select.rows_{rows}",
+            lambda rows=rows: db.select(query, [rows]),
+            iterations=max(50, 20000 // rows),
+        )
+        await suite.measure(
+            f"database.select_tuples.rows_{rows}",
+            lambda rows=rows: db.select(query, [rows], format=False),
+            iterations=max(50, 20000 // rows),
+        )
+
+
+async def bench_commit(suite, db):
+    await suite.measure(
+        "database.commit.insert",
+        lambda: db.commit(
+            f"INSERT INTO {TABLE} (name, value) VALUES ($1, $2)",
+            ["bench", 1],
+        ),
+        iterations=2000,
+    )
+    await suite.measure(
+        "database.commit.insert_returning",
+        lambda: db.commit(
+            f"INSERT INTO {TABLE} (name, value) VALUES ($1, $2) RETURNING id",
+            ["bench", 1],
+        ),
+        iterations=2000,
+    )
+    await suite.measure(
+        "database.commit.update",
+        lambda: db.commit(
+            f"UPDATE {TABLE} SET value = value + 1 WHERE id = $1", [1]
+        ),
+        iterations=2000,
+    )
+
+
+async def bench_transaction(suite, db):
+    async def transaction(statements):
+        async with db.transaction():
+            for _ in range(statements):
+                await db.commit(
+                    f"UPDATE {TABLE} SET value = value + 1 WHERE id = $1", [2]
+                )
+
+    for statements in (1, 10):
+        await suite.measure(
+            f"database.transaction.statements_{statements}",
+            lambda statements=statements: transaction(statements),
+            iterations=1000,
+        )
+
+
+async def bench_concurrency(suite, db):
+    query = f"SELECT * FROM {TABLE} ORDER BY id LIMIT 100"
+    for concurrency in (1, 10, 20, 50):
+        await suite.measure(
+            f"database.select.rows_100.c{concurrency}",
+            lambda: db.select(query),
+            iterations=4000,
+            concurrency=concurrency,
+        )
+
+
+async def bench_pool_contention(suite, db):
+    """Hold each connection for 5ms so callers queue on the pool.
+
+    With the pool at `max_size=20`, anything above 20 concurrent callers
+    shows up as latency spent waiting in `pool.acquire`.
+    """
+    for concurrency in (20, 40, 100, 200):
+        await suite.measure(
+            f"database.pool_contention.c{concurrency}",
+            lambda: db.select("SELECT pg_sleep(0.005)"),
+            iterations=2000,
+            concurrency=concurrency,
+            warmup=0,
+        )
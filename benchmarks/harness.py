@@ -0,0 +1,173 @@
+import asyncio
+import platform
+import statistics
+import subprocess
+import time
+
+
+class Suite:
+    """Collects named benchmark results for one run."""
+
+    def __init__(self, scale=1.0, repeat=5):
+        self.scale = scale
+        self.repeat = repeat
+        self.results = {}
+
+    def iterations(self, count):
+        return max(1, int(count * self.scale))
+
+    async def measure(self, name, func, iterations, concurrency=1, warmup=10):
+        """Run `func` `iterations` times across `concurrency` coroutines,
+        `repeat` times over, and keep the median of every metric.
+        """
+        for _ in range(min(warmup, iterations)):
+            await func()
+
+        iterations = self.iterations(iterations)
+        share, extra = divmod(iterations, concurrency)
+        rounds = []
+        for _ in range(self.repeat):
+            latencies = []
+
+            async def worker(count):
+                for _ in range(count):
+                    started = time.perf_counter()
+                    await func()
+                    latencies.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            await asyncio.gather(
+                *(worker(share + (i < extra)) for i in range(concurrency))
+            )
+            elapsed = time.perf_counter() - started
+            rounds.append(summarize(latencies, elapsed, concurrency))
+
+        self.results[name] = combine(rounds)
+        print(format_result(name, self.results[name]))
+        return self.results[name]
+
+    def report(self):
+        return {
+            "meta": metadata(self.scale, self.repeat),
+            "results": self.results,
+        }
+
+
+def summarize(latencies, elapsed, concurrency):
+    latencies = sorted(latencies)
+    return {
+        "iterations": len(latencies),
+        "concurrency": concurrency,
+        "ops_per_sec": len(latencies) / elapsed,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": latencies[-1] * 1000,
+    }
+
+
+def combine(rounds):
+    """Median of each metric across rounds, plus its relative spread.
+
+    `spread` is (max - min) / median per metric: how far two runs of the
+    same code disagreed, which is the noise floor for comparisons.
+    """
+    result = {"repeat": len(rounds)}
+    spread = {}
+    for metric, value in rounds[0].items():
+        values = [item[metric] for item in rounds]
+        if isinstance(value, float):
+            median = statistics.median(values)
+            result[metric] = median
+            spread[metric] = (max(values) - min(values)) / median
+        else:
+            result[metric] = value
+    result["spread"] = spread
+    return result
+
+
+def percentile(ordered, pct):
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def format_result(name, result):
+    return (
+        f"{name:<45} {result['ops_per_sec']:>11.1f} ops/s  "
+        f"p50 {result['p50_ms']:>8.3f}ms  p99 {result['p99_ms']:>8.3f}ms  "
+        f"±{result['spread']['ops_per_sec']:.1%}"
+    )
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def git_dirty():
+    """Whether the working tree has changes that HEAD does not describe."""
+    try:
+        return bool(
+            subprocess.run(
+                ["git", "status", "--porcelain"],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return False
+
+
+def metadata(scale, repeat):
+    return {
+        "commit": git_commit(),
+        "dirty": git_dirty(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": scale,
+        "repeat": repeat,
+    }
+
+
+def compare(baseline, current, threshold=0.10):
+    """Return (name, metric, before, after, change, noise) per regression.
+
+    Medians are compared. Throughput regresses when it drops, and p95
+    latency when it grows, by more than both `threshold` and the larger
+    spread seen across either run's repetitions, so that a noisy machine
+    cannot report its own jitter as a regression.
+    """
+    regressions = []
+    for name, after in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+
+        for metric, sign in (("ops_per_sec", -1), ("p95_ms", 1)):
+            change = after[metric] / before[metric] - 1
+            noise = max(
+                before.get("spread", {}).get(metric, 0.0),
+                after.get("spread", {}).get(metric, 0.0),
+            )
+            if change * sign > max(threshold, noise):
+                regressions.append(
+                    (
+                        name,
+                        metric,
+                        before[metric],
+                        after[metric],
+                        change,
+                        noise,
+                    )
+                )
+    return regressions
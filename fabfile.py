@@ -1,15 +1,23 @@
 #!/usr/bin/env python3
+import base64
+import hashlib
+import io
 import logging
 import os
+import sys
+import tarfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
-from fabric import Connection
+from fabric import Config, Connection
 from invoke import Responder
 
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
 )
+logger = logging.getLogger("fabfile")
 
 """""" """""" """""" """""" """""" """""" """""" """""" """""" """""" """"""
 """""" """""" """""" """"" CONFIGURATIONS """ """""" """""" """""" """"""
@@ -21,6 +29,12 @@ ENVIRONMENT = os.getenv("ENVIRONMENT", "dev")
 DEPLOYMENT = os.getenv("DEPLOYMENT", "make")
 REMOTE_USER = os.getenv("REMOTE_USER", "root")
 REMOTE_HOST = os.getenv("REMOTE_HOST", "127.0.0.1")
+REMOTE_HOSTS = [
+    host.strip()
+    for host in os.getenv("REMOTE_HOSTS", REMOTE_HOST).split(",")
+    if host.strip()
+]
+MAX_PARALLEL_HOSTS = int(os.getenv("MAX_PARALLEL_HOSTS", "10"))
 REMOTE_DIR = (
     os.getenv("REMOTE_DIR", f"/{REMOTE_USER}") or f"/home/{REMOTE_USER}"
 )
@@ -39,206 +53,309 @@ REGISTRY_TYPE = os.getenv("REGISTRY_TYPE", "ghcr")
 
 """""" """""" """""" """""" """""" """""" """""" """""" """""" """""" """"""
 
+_connections = {}
+_output_lock = threading.Lock()
 
-def ping_remote_host():
-    conn_kwargs = {
-        "host": REMOTE_HOST,
-        "user": REMOTE_USER,
-    }
 
-    if REMOTE_PASSWORD:
-        conn_kwargs["connect_kwargs"] = {
-            "password": REMOTE_PASSWORD,
-            "look_for_keys": False,
-            "allow_agent": False,
+class HostStream:
+    """Line-buffered stream prefixing every line with its host, so output
+    from hosts deploying concurrently does not interleave mid-line and
+    stays attributable.
+    """
+
+    def __init__(self, host, stream):
+        self.host = host
+        self.stream = stream
+        self.buffer = ""
+
+    def write(self, data):
+        self.buffer += data
+        *lines, self.buffer = self.buffer.split("\n")
+        if lines:
+            with _output_lock:
+                self.stream.write(
+                    "".join(f"[{self.host}] {line}\n" for line in lines)
+                )
+                self.stream.flush()
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+def say(conn, message):
+    """Print a stage message prefixed with the host it concerns."""
+    HostStream(conn.host, sys.stdout).write(f"{message}\n")
+
+
+def get_connection(host=REMOTE_HOST):
+    """Return the SSH connection for a host, reused across stages."""
+    if host not in _connections:
+        conn_kwargs = {
+            "host": host,
+            "user": REMOTE_USER,
+            "config": Config(
+                overrides={
+                    "run": {
+                        "out_stream": HostStream(host, sys.stdout),
+                        "err_stream": HostStream(host, sys.stderr),
+                    }
+                }
+            ),
         }
-    elif SSH_KEY_PATH:
-        conn_kwargs["connect_kwargs"] = {"key_filename": SSH_KEY_PATH}
 
-    conn = Connection(**conn_kwargs)
+        if REMOTE_PASSWORD:
+            conn_kwargs["connect_kwargs"] = {
+                "password": REMOTE_PASSWORD,
+                "look_for_keys": False,
+                "allow_agent": False,
+            }
+        elif SSH_KEY_PATH:
+            conn_kwargs["connect_kwargs"] = {"key_filename": SSH_KEY_PATH}
+
+        _connections[host] = Connection(**conn_kwargs)
+    return _connections[host]
+
+
+def close_connections():
+    for conn in _connections.values():
+        conn.close()
+    _connections.clear()
+
+
+def run_on_hosts(stage, hosts=None, **kwargs):
+    """Run `stage(conn, **kwargs)` on every host concurrently.
+
+    At most MAX_PARALLEL_HOSTS run at once. Returns the hosts the stage
+    succeeded on, so later stages can skip hosts that already failed.
+    """
+    hosts = hosts if hosts is not None else REMOTE_HOSTS
+    succeeded = []
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_HOSTS) as pool:
+        futures = {
+            pool.submit(stage, get_connection(host), **kwargs): host
+            for host in hosts
+        }
+        for future in as_completed(futures):
+            host = futures[future]
+            try:
+                future.result()
+                succeeded.append(host)
+            except Exception as e:
+                logger.error(f"[{host}] {stage.__name__} failed: {e}")
+    return [host for host in hosts if host in succeeded]
+
+
+def run_on_all_hosts(stage, **kwargs):
+    """Run a stage on every host and exit non-zero if any of them failed."""
+    succeeded = run_on_hosts(stage, **kwargs)
+    failed = [host for host in REMOTE_HOSTS if host not in succeeded]
+    if failed:
+        raise SystemExit(f"{stage.__name__} failed on: {', '.join(failed)}")
+
+
+def local_files(project_root, predicate):
+    """Map `./relative/path` to (path, sha256) for matching local files."""
+    files = {}
+    for path in project_root.rglob("*"):
+        if path.is_file() and predicate(path):
+            digest = hashlib.sha256(path.read_bytes()).hexdigest()
+            files[f"./{path.relative_to(project_root)}"] = (path, digest)
+    return files
+
+
+def remote_checksums(conn, remote_base):
+    result = conn.run(
+        f"cd {remote_base} 2>/dev/null && "
+        "find . -type f -exec sha256sum {} + || true",
+        hide=True,
+        warn=True,
+    )
+    checksums = {}
+    for line in result.stdout.strip().splitlines():
+        digest, _, path = line.partition("  ")
+        checksums[path] = digest
+    return checksums
+
+
+def run_with_stdin(conn, command, data):
+    """Run `command` on the host with `data` piped to its stdin.
 
+    Invoke's `in_stream` reads one character at a time and decodes it as
+    text, so binary payloads are written to the SSH channel directly.
+    """
+    channel = conn.create_session()
     try:
-        result = conn.run("hostname", hide=True)
-        print(f"Connected to {REMOTE_HOST}, hostname: {result.stdout.strip()}")
-    except Exception as e:
-        print(f"Failed to connect to {REMOTE_HOST}: {e}")
+        channel.exec_command(command)
+        channel.sendall(data)
+        channel.shutdown_write()
+        stderr = channel.makefile_stderr("rb").read()
+        status = channel.recv_exit_status()
+    finally:
+        channel.close()
+    if status:
+        raise RuntimeError(
+            f"{command!r} exited with {status}: "
+            f"{stderr.decode(errors='replace').strip()}"
+        )
 
 
-def push_env_files():
-    project_root = Path.cwd()
-    project_name = project_root.name
-    remote_base = f"/etc/{project_name}/profile"
+def sync_files(conn, files, remote_base):
+    """Ship changed files to `remote_base` as a single tar stream.
 
-    conn_kwargs = {
-        "host": REMOTE_HOST,
-        "user": REMOTE_USER,
+    Files whose sha256 already matches on the remote are skipped, and the
+    rest are piped straight into `tar` on the host, so secrets are never
+    staged in a temporary file and arrive readable only by their owner.
+    """
+    conn.run(
+        f"sudo mkdir -p {remote_base} && "
+        f"sudo chown -R $(whoami) {remote_base}",
+        hide=True,
+    )
+    existing = remote_checksums(conn, remote_base)
+    changed = {
+        relative: path
+        for relative, (path, digest) in files.items()
+        if existing.get(relative) != digest
     }
+    if not changed:
+        say(conn, f"=== {remote_base} already up to date")
+        return []
+
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode="w:gz") as tar:
+        for relative, path in sorted(changed.items()):
+            say(conn, f"=== Pushing {path} to {remote_base}")
+            tar.add(str(path), arcname=relative)
+
+    run_with_stdin(
+        conn,
+        f"umask 077 && tar --no-same-owner --no-same-permissions "
+        f"-xzf - -C {remote_base}",
+        archive.getvalue(),
+    )
+    return sorted(changed)
 
-    if REMOTE_PASSWORD:
-        conn_kwargs["connect_kwargs"] = {
-            "password": REMOTE_PASSWORD,
-            "look_for_keys": False,
-            "allow_agent": False,
-        }
-    elif SSH_KEY_PATH:
-        conn_kwargs["connect_kwargs"] = {"key_filename": SSH_KEY_PATH}
-
-    conn = Connection(**conn_kwargs)
 
-    print(
-        f"============== Syncing .env* files to {remote_base} =============="
+def fetch_files(conn, remote_base, find_filter, project_root):
+    """Pull files under `remote_base` as a single tar stream."""
+    archive = io.BytesIO()
+    result = conn.run(
+        f"test -d {remote_base} && cd {remote_base} && "
+        f"find . -type f {find_filter} | tar -czf - -T - | base64 -w0",
+        hide=True,
+        warn=True,
     )
-    conn.run(f"sudo mkdir -p {remote_base}")
-    conn.run(f"sudo chown -R $(whoami) {remote_base}")
-
-    for env_file in project_root.rglob("*"):
-        if env_file.is_file() and env_file.name.startswith(".env"):
-            relative_path = env_file.parent.relative_to(project_root)
-            remote_dir = Path(remote_base) / relative_path
+    if result.failed or not result.stdout.strip():
+        say(conn, f"=== Nothing to pull from {remote_base}")
+        return []
+
+    archive.write(base64.b64decode(result.stdout.strip()))
+    archive.seek(0)
+    with tarfile.open(fileobj=archive, mode="r:gz") as tar:
+        names = [member.name for member in tar.getmembers() if member.isfile()]
+        for name in names:
+            relative = name.removeprefix("./")
+            say(
+                conn,
+                f"======= Pulling {remote_base}/{relative} to {project_root}",
+            )
+        tar.extractall(project_root, filter="data")
+    return names
 
-            conn.run(f"mkdir -p {remote_dir}")
-            print(f"=== Pushing {env_file} to {remote_dir}/{env_file.name}")
-            conn.put(str(env_file), remote=f"{remote_dir}/{env_file.name}")
 
-    print("================= Env files pushed successfully =================")
+def is_env_file(path):
+    return path.name.startswith(".env")
 
 
-def push_cert_files():
-    project_root = Path.cwd()
-    project_name = project_root.name
-    remote_base = f"/etc/{project_name}/certs"
+def is_cert_file(path):
+    return path.suffix in CERT_SUFFIXES
 
-    conn_kwargs = {
-        "host": REMOTE_HOST,
-        "user": REMOTE_USER,
-    }
 
-    if REMOTE_PASSWORD:
-        conn_kwargs["connect_kwargs"] = {
-            "password": REMOTE_PASSWORD,
-            "look_for_keys": False,
-            "allow_agent": False,
-        }
-    elif SSH_KEY_PATH:
-        conn_kwargs["connect_kwargs"] = {"key_filename": SSH_KEY_PATH}
+CERT_SUFFIXES = [".crt", ".key", ".pem", ".p12"]
+CERT_FIND_FILTER = (
+    "\\( -name '*.crt' -o -name '*.key' -o -name '*.pem' -o -name '*.p12' \\)"
+)
 
-    conn = Connection(**conn_kwargs)
 
-    print(f"============== Syncing cert files to {remote_base} ==============")
-    conn.run(f"sudo mkdir -p {remote_base}")
-    conn.run(f"sudo chown -R $(whoami) {remote_base}")
+def ping_remote_host(conn):
+    try:
+        result = conn.run("hostname", hide=True)
+        say(conn, f"Connected, hostname: {result.stdout.strip()}")
+    except Exception as e:
+        say(conn, f"Failed to connect: {e}")
+        raise
 
-    for cert_file in project_root.rglob("*"):
-        if cert_file.is_file() and cert_file.suffix in [
-            ".crt",
-            ".key",
-            ".pem",
-            ".p12",
-        ]:
-            relative_path = cert_file.parent.relative_to(project_root)
-            remote_dir = Path(remote_base) / relative_path
 
-            conn.run(f"mkdir -p {remote_dir}")
-            print(f"=== Pushing {cert_file} to {remote_dir}/{cert_file.name}")
-            conn.put(str(cert_file), remote=f"{remote_dir}/{cert_file.name}")
+def push_env_files(conn, files=None):
+    project_root = Path.cwd()
+    project_name = project_root.name
+    remote_base = f"/etc/{project_name}/profile"
 
-    print("================= Cert files pushed successfully =================")
+    say(
+        conn,
+        f"============== Syncing .env* files to {remote_base} ==============",
+    )
+    if files is None:
+        files = local_files(project_root, is_env_file)
+    sync_files(conn, files, remote_base)
+    say(
+        conn,
+        "================= Env files pushed successfully =================",
+    )
 
 
-def pull_cert_files():
+def push_cert_files(conn, files=None):
     project_root = Path.cwd()
     project_name = project_root.name
     remote_base = f"/etc/{project_name}/certs"
 
-    conn_kwargs = {
-        "host": REMOTE_HOST,
-        "user": REMOTE_USER,
-    }
-
-    if REMOTE_PASSWORD:
-        conn_kwargs["connect_kwargs"] = {
-            "password": REMOTE_PASSWORD,
-            "look_for_keys": False,
-            "allow_agent": False,
-        }
-    elif SSH_KEY_PATH:
-        conn_kwargs["connect_kwargs"] = {"key_filename": SSH_KEY_PATH}
-
-    conn = Connection(**conn_kwargs)
-
-    print(
-        f"============== Pulling cert files from {remote_base} =============="
+    say(
+        conn,
+        f"============== Syncing cert files to {remote_base} ==============",
+    )
+    if files is None:
+        files = local_files(project_root, is_cert_file)
+    sync_files(conn, files, remote_base)
+    say(
+        conn,
+        "================= Cert files pushed successfully =================",
     )
 
-def pull_cert_file(remote_cert_path: str, local_path: Path):
-    print(f"======= Pulling {remote_cert_path} to {local_path}")
-    local_path.parent.mkdir(parents=True, exist_ok=True)
-    conn.get(remote=remote_cert_path, local=str(local_path))
-
-# Find all .crt, .key, .pem files recursively
-find_command = (
-    f"find {remote_base} -type f "
-    "\\( "
-    "-name '*.crt' "
-    "-o -name '*.key' "
-    "-o -name '*.pem' "
-    "-o -name '*.p12' "
-    "\\)"
-)
-
-result = conn.run(find_command, hide=True, warn=True)
 
-for line in result.stdout.strip().splitlines():
-    remote_path = Path(line.strip())
-    relative_path = remote_path.relative_to(remote_base)
-    local_path = project_root / relative_path
-    pull_cert_file(str(remote_path), local_path)
+def pull_cert_files(conn):
+    project_root = Path.cwd()
+    project_name = project_root.name
+    remote_base = f"/etc/{project_name}/certs"
 
-print("================= Cert files pulled successfully =================")
+    say(
+        conn,
+        f"============== Pulling cert files from {remote_base} ==============",
+    )
+    fetch_files(conn, remote_base, CERT_FIND_FILTER, project_root)
+    say(
+        conn,
+        "================= Cert files pulled successfully =================",
+    )
 
 
-def pull_env_files():
+def pull_env_files(conn):
     project_root = Path.cwd()
     project_name = project_root.name
     remote_base = f"/etc/{project_name}/profile"
 
-    conn_kwargs = {
-        "host": REMOTE_HOST,
-        "user": REMOTE_USER,
-    }
-
-    if REMOTE_PASSWORD:
-        conn_kwargs["connect_kwargs"] = {
-            "password": REMOTE_PASSWORD,
-            "look_for_keys": False,
-            "allow_agent": False,
-        }
-    elif SSH_KEY_PATH:
-        conn_kwargs["connect_kwargs"] = {"key_filename": SSH_KEY_PATH}
-
-    conn = Connection(**conn_kwargs)
-
-    print(
-        f"============== Pulling env files from {remote_base} =============="
+    say(
+        conn,
+        f"============== Pulling env files from {remote_base} ==============",
+    )
+    fetch_files(conn, remote_base, "-name '.env*'", project_root)
+    say(
+        conn,
+        "================= Env files pulled successfully =================",
     )
-
-def pull_env_file(remote_env_path: str, local_path: Path):
-    print(f"======= Pulling {remote_env_path} to {local_path}")
-    local_path.parent.mkdir(parents=True, exist_ok=True)
-    conn.get(remote=remote_env_path, local=str(local_path))
-
-# Find all files named .env or starting with .env. recursively on remote
-find_command = f"find {remote_base} -type f -name '.env*' "
-
-result = conn.run(find_command, hide=True, warn=True)
-
-for line in result.stdout.strip().splitlines():
-    remote_path = Path(line.strip())
-    relative_path = remote_path.relative_to(remote_base)
-    local_path = project_root / relative_path
-    pull_env_file(str(remote_path), local_path)
-
-print("================= Env files pulled successfully =================")
 
 
 def install_dependencies(conn):
@@ -251,26 +368,37 @@ def install_dependencies(conn):
         "libffi-dev",
         "make",
     ]
-    missing = []
-    for dep in deps:
-        result = conn.run(f"which {dep}", warn=True, hide=True)
-        if not result.stdout.strip():
-            missing.append(dep)
+    # One round trip for every package instead of a `which` per package;
+    # dpkg also knows about packages that install no binary of that name.
+    result = conn.run(
+        f"dpkg-query -W -f='${{Package}} ${{Status}}\\n' {' '.join(deps)} "
+        "2>/dev/null; command -v kubectl helm || true",
+        warn=True,
+        hide=True,
+    )
+    lines = result.stdout.strip().splitlines()
+    installed = {
+        line.split()[0] for line in lines if line.endswith("ok installed")
+    }
+    binaries = {line.rsplit("/", 1)[-1] for line in lines if "/" in line}
+    missing = [dep for dep in deps if dep not in installed]
 
     if missing:
-        print(f"======= Installing dependencies: {', '.join(missing)} =======")
+        say(
+            conn,
+            f"======= Installing dependencies: {', '.join(missing)} =======",
+        )
         conn.run("sudo apt-get update")
         conn.run(f"sudo apt-get install -y {' '.join(missing)}")
-        print("======= Dependencies installed =======")
+        say(conn, "======= Dependencies installed =======")
     else:
-        print("======= All dependencies already installed =======")
+        say(conn, "======= All dependencies already installed =======")
 
     # Install kubectl
-    kubectl_check = conn.run("which kubectl", warn=True, hide=True)
-    if kubectl_check.stdout.strip():
-        print("======= kubectl already installed =======")
+    if "kubectl" in binaries:
+        say(conn, "======= kubectl already installed =======")
     else:
-        print("======= Installing kubectl =======")
+        say(conn, "======= Installing kubectl =======")
         version_result = conn.run(
             "curl -s https://storage.googleapis.com/kubernetes-release/release/stable.txt",
             hide=True,
@@ -282,18 +410,17 @@ def install_dependencies(conn):
         )
         conn.run("chmod +x ./kubectl")
         conn.run("sudo mv ./kubectl /usr/local/bin/kubectl")
-        print("======= kubectl installed =======")
+        say(conn, "======= kubectl installed =======")
 
     # Install Helm
-    helm_check = conn.run("which helm", warn=True, hide=True)
-    if helm_check.stdout.strip():
-        print("======= helm already installed =======")
+    if "helm" in binaries:
+        say(conn, "======= helm already installed =======")
     else:
-        print("======= Installing helm =======")
+        say(conn, "======= Installing helm =======")
         conn.run(
             "curl https://raw.githubusercontent.com/helm/helm/main/scripts/get-helm-3 | bash"
         )
-        print("======= helm installed =======")
+        say(conn, "======= helm installed =======")
 
 
 def append_shell_lines_to_rc(conn):
@@ -318,7 +445,7 @@ def append_shell_lines_to_rc(conn):
     ).stdout.strip()
 
     if not shell_path:
-        print("⚠️ Could not detect user shell, falling back to ~/.profile")
+        say(conn, "⚠️ Could not detect user shell, falling back to ~/.profile")
         rc_file = "~/.profile"
     else:
         shell_name = shell_path.split("/")[-1].lower()
@@ -327,9 +454,10 @@ def append_shell_lines_to_rc(conn):
         elif shell_name == "zsh":
             rc_file = "~/.zshrc"
         else:
-            print(
+            say(
+                conn,
                 f"⚠️ Detected shell '{shell_name}' is not explicitly "
-                f"supported, falling back to ~/.profile"
+                f"supported, falling back to ~/.profile",
             )
             rc_file = "~/.profile"
 
@@ -342,15 +470,17 @@ def append_shell_lines_to_rc(conn):
         )
         result = conn.run(check_cmd, warn=True)
         if result.failed:
-            print(f"⚠️ Warning: Failed to append line to {rc_file}: {line}")
+            say(
+                conn, f"⚠️ Warning: Failed to append line to {rc_file}: {line}"
+            )
 
-    print(f"✅ Appended lines to {rc_file} if not already present.")
+    say(conn, f"✅ Appended lines to {rc_file} if not already present.")
 
 
 def install_docker(conn):
     result = conn.run("which docker", warn=True, hide=True)
     if result.stdout.strip():
-        print("======= Docker already installed =======")
+        say(conn, "======= Docker already installed =======")
         return
 
     INSTALL = "sudo apt-get install -y"
@@ -383,16 +513,16 @@ def install_docker(conn):
     conn.run("sudo usermod -aG docker ${USER}")
     conn.run("sudo systemctl enable docker")
     conn.run("sudo systemctl start docker")
-    print("======= Docker installed =======")
+    say(conn, "======= Docker installed =======")
 
 
 def install_k3s(conn):
     result = conn.run("which k3s", warn=True, hide=True)
     if result.stdout.strip():
-        print("======= k3s already installed =======")
+        say(conn, "======= k3s already installed =======")
         return
 
-    print("======= Installing k3s =======")
+    say(conn, "======= Installing k3s =======")
     conn.run(
         'curl -sfL https://get.k3s.io | INSTALL_K3S_EXEC="--disable=traefik" sh -',
         pty=True,
@@ -402,8 +532,8 @@ def install_k3s(conn):
     conn.run("echo 'export KUBECONFIG=/etc/rancher/k3s/k3s.yaml' >> ~/.bashrc")
 
     version_result = conn.run("k3s --version", hide=True)
-    print(f"Installed k3s version: {version_result.stdout.strip()}")
-    print("======= k3s installed =======")
+    say(conn, f"Installed k3s version: {version_result.stdout.strip()}")
+    say(conn, "======= k3s installed =======")
 
 
 def clone_repo(conn):
@@ -419,7 +549,7 @@ def clone_repo(conn):
     )
 
     if "not exists" in result.stdout:
-        print("======= Cloning the repository =======")
+        say(conn, "======= Cloning the repository =======")
         conn.run(f"git clone {AUTH_GIT_URL}", pty=True, watchers=[promptpass])
 
     conn.run(f"git config --global --add safe.directory {GIT_DIR}")
@@ -432,7 +562,7 @@ def clone_repo(conn):
                 line.strip() for line in result.stdout.strip().splitlines()
             ]
 
-            print(f"=== Remote branches: {remote_branches} ===")
+            say(conn, f"=== Remote branches: {remote_branches} ===")
 
             if "origin/main" in remote_branches:
                 branch_name = "main"
@@ -448,18 +578,19 @@ def clone_repo(conn):
         current_branch = conn.run(
             "git rev-parse --abbrev-ref HEAD", hide=True
         ).stdout.strip()
-        print(f"=== Current branch: {current_branch} ==")
+        say(conn, f"=== Current branch: {current_branch} ==")
 
         if current_branch != branch_name:
-            print(f"=== Stashing changes on branch {current_branch} ===")
+            say(conn, f"=== Stashing changes on branch {current_branch} ===")
             conn.run("git stash", warn=True)
-            print(f"Switching to branch {branch_name}...")
+            say(conn, f"Switching to branch {branch_name}...")
             conn.run(f"git checkout {branch_name}")
 
         conn.run(f"git fetch origin && git reset --hard origin/{branch_name}")
 
-    print(
-        f"=== Repository cloned & checked out to {branch_name} branch ======="
+    say(
+        conn,
+        f"=== Repository cloned & checked out to {branch_name} branch =======",
     )
 
 
@@ -467,61 +598,42 @@ def copy_env_files(conn):
     project_name = PROJECT_NAME
     remote_base = f"/etc/{project_name}/profile"
 
-    print(f"=====Copying env files from {remote_base} to {GIT_SUBDIR} =======")
-
-    result = conn.run(
-        f"find {remote_base} -type f -name '*.env.*'",
-        hide=True,
+    say(
+        conn,
+        f"=====Copying env files from {remote_base} to {GIT_SUBDIR} =======",
     )
-    env_files = result.stdout.strip().splitlines()
-
-    for env_file in env_files:
-        remote_path = Path(env_file)
-        relative_path = remote_path.relative_to(remote_base)
-
-        # local target path: GIT_SUBDIR / relative_path
-        local_target_path = Path(GIT_SUBDIR) / relative_path
 
-        print(f"Copying {env_file} → {local_target_path}")
-
-        conn.run(f"mkdir -p {local_target_path.parent}")
-        conn.run(f"cp {env_file} {local_target_path}")
+    # `cp --parents` recreates each file's relative directory, so the whole
+    # tree is copied in one command.
+    conn.run(
+        f"cd {remote_base} && "
+        f"find . -type f -name '*.env.*' "
+        f"-exec cp --parents -t {GIT_SUBDIR} {{}} +"
+    )
 
-    print("======= Env files copied successfully =======")
+    say(conn, "======= Env files copied successfully =======")
 
 
 def copy_cert_files(conn):
     project_name = PROJECT_NAME
     remote_base = f"/etc/{project_name}/certs"
 
-    print(
-        f"=====Copying cert files from {remote_base} to {GIT_SUBDIR} ======="
+    say(
+        conn,
+        f"=====Copying cert files from {remote_base} to {GIT_SUBDIR} =======",
     )
 
-    result = conn.run(
-        f"find {remote_base} -type f \\( -name '*.crt' -o -name '*.key' "
-        f"-o -name '*.pem' -o -name '*.p12' \\)",
-        hide=True,
+    conn.run(
+        f"cd {remote_base} && find . -type f {CERT_FIND_FILTER} "
+        f"-exec cp --parents -t {GIT_SUBDIR} {{}} +"
     )
-    cert_files = result.stdout.strip().splitlines()
-
-    for cert_file in cert_files:
-        remote_path = Path(cert_file)
-        relative_path = remote_path.relative_to(remote_base)
-
-        local_target_path = Path(GIT_SUBDIR) / relative_path
-
-        print(f"Copying {cert_file} → {local_target_path}")
-
-        conn.run(f"mkdir -p {local_target_path.parent}")
-        conn.run(f"cp {cert_file} {local_target_path}")
 
-    print("======= Cert files copied successfully =======")
+    say(conn, "======= Cert files copied successfully =======")
 
 
 def docker_login(conn, registry_type=None):
     if not registry_type:
-        print("No registry type provided, skipping Docker login.")
+        say(conn, "No registry type provided, skipping Docker login.")
         return
 
     registry_type = registry_type.lower()
@@ -533,7 +645,7 @@ def docker_login(conn, registry_type=None):
             raise ValueError(
                 "REGISTRY_USERNAME and REGISTRY_PASSWORD must be set"
             )
-        print("Logging in to GHCR...")
+        say(conn, "Logging in to GHCR...")
         conn.run(
             f"echo '{password}' | docker login ghcr.io -u {username} --password-stdin"
         )
@@ -545,7 +657,7 @@ def docker_login(conn, registry_type=None):
             raise ValueError(
                 "REGISTRY_USERNAME and REGISTRY_PASSWORD must be set"
             )
-        print("Logging in to Docker Hub...")
+        say(conn, "Logging in to Docker Hub...")
         conn.run(
             f"echo '{password}' | docker login -u {username} --password-stdin"
         )
@@ -557,7 +669,7 @@ def docker_login(conn, registry_type=None):
             raise ValueError(
                 "AWS_REGION and AWS_ACCOUNT_ID must be set for ECR login."
             )
-        print("Logging in to AWS ECR...")
+        say(conn, "Logging in to AWS ECR...")
         cmd = (
             f"aws ecr get-login-password --region {aws_region} | "
             f"docker login --username AWS --password-stdin {aws_account_id}.dkr.ecr.{aws_region}.amazonaws.com"
@@ -574,7 +686,7 @@ def deploy(conn, profile=None):
 
         if DEPLOYMENT == "make":
             if ENVIRONMENT in ("prod"):
-                print("======= Deploying with kubernetes  =======")
+                say(conn, "======= Deploying with kubernetes  =======")
                 conn.run(
                     f"""
                     sudo bash -c '
@@ -603,53 +715,76 @@ def deploy(conn, profile=None):
         else:
             conn.run("sudo docker compose up --build -d")
 
-    print("======= Application deployed =======")
+    say(conn, "======= Application deployed =======")
 
 
-def handle_connection():
-    conn_kwargs = {
-        "host": REMOTE_HOST,
-        "user": REMOTE_USER,
-    }
-
-    if REMOTE_PASSWORD:
-        conn_kwargs["connect_kwargs"] = {
-            "password": REMOTE_PASSWORD,
-            "look_for_keys": False,
-            "allow_agent": False,
-        }
-    elif SSH_KEY_PATH:
-        conn_kwargs["connect_kwargs"] = {"key_filename": SSH_KEY_PATH}
+def deploy_prod(conn):
+    deploy(conn, profile="prod")
 
-    conn = Connection(**conn_kwargs)
 
+def connect(conn):
     result = conn.run("hostname", hide=True)
-    print(
-        f"======= Connected to {conn_kwargs.get('host')}, "
-        f"hostname: {result.stdout.strip()} ======="
-    )
-    install_dependencies(conn)
-    append_shell_lines_to_rc(conn)
-    install_docker(conn)
-    install_k3s(conn)
-    clone_repo(conn)
-    copy_env_files(conn)
-    copy_cert_files(conn)
-    deploy(conn, profile="prod")
+    say(conn, f"======= Connected, hostname: {result.stdout.strip()} =======")
+
+
+DEPLOY_STAGES = [
+    connect,
+    install_dependencies,
+    append_shell_lines_to_rc,
+    install_docker,
+    install_k3s,
+    clone_repo,
+    copy_env_files,
+    copy_cert_files,
+    deploy_prod,
+]
+
+
+def deploy_host(conn):
+    """Run every deploy stage on one host, stopping at its first failure."""
+    for stage in DEPLOY_STAGES:
+        try:
+            stage(conn)
+        except Exception as e:
+            raise RuntimeError(f"{stage.__name__}: {e}") from e
+
+
+def handle_connection(hosts=None):
+    """Deploy to every host concurrently.
+
+    Each host runs the whole pipeline on its own, so a slow stage on one
+    host does not hold the others back and the deploy takes about as long
+    as the slowest host. Failed hosts are reported at the end.
+    """
+    hosts = hosts or REMOTE_HOSTS
+    succeeded = run_on_hosts(deploy_host, hosts)
+
+    failed = [host for host in hosts if host not in succeeded]
+    print(f"======= Deployed to {len(succeeded)}/{len(hosts)} hosts =======")
+    if failed:
+        raise SystemExit(f"Deployment failed on: {', '.join(failed)}")
 
 
 if __name__ == "__main__":
     import sys
 
-    if "push-env" in sys.argv:
-        push_env_files()
-    elif "push-cert" in sys.argv:
-        push_cert_files()
-    elif "pull-env" in sys.argv:
-        pull_env_files()
-    elif "pull-cert" in sys.argv:
-        pull_cert_files()
-    elif "ping" in sys.argv:
-        ping_remote_host()
-    else:
-        handle_connection()
+    try:
+        # Local files are hashed once and shared by every host.
+        if "push-env" in sys.argv:
+            run_on_all_hosts(
+                push_env_files, files=local_files(Path.cwd(), is_env_file)
+            )
+        elif "push-cert" in sys.argv:
+            run_on_all_hosts(
+                push_cert_files, files=local_files(Path.cwd(), is_cert_file)
+            )
+        elif "pull-env" in sys.argv:
+            pull_env_files(get_connection(REMOTE_HOSTS[0]))
+        elif "pull-cert" in sys.argv:
+            pull_cert_files(get_connection(REMOTE_HOSTS[0]))
+        elif "ping" in sys.argv:
+            run_on_all_hosts(ping_remote_host)
+        else:
+            handle_connection()
+    finally:
+        close_connections()
@@ -1,18 +1,28 @@
 #!/bin/bash
 
-BACKUP_SCRIPT_PATH="/usr/local/bin/backup.sh"
-BACKUP_CRON="0 2 * * * /bin/bash $BACKUP_SCRIPT_PATH"
+BACKUP_COMMAND="python -m src.backup create"
+BACKUP_ENV=/etc/backup.env
+BACKUP_CRON="0 2 * * * /bin/bash -c '. $BACKUP_ENV && cd /app && /usr/local/bin/$BACKUP_COMMAND' >/proc/1/fd/1 2>/proc/1/fd/2"
 
 # ---- Cron setup ----
 if [ "$ENV" == "prod" ]; then
 	echo "✅ Production environment detected. Setting up cron job..."
 
 	echo "⏱ Starting cron service..."
+	# cron jobs do not inherit the container environment; the credentials
+	# go to a root-only file the job sources, not /etc/environment
+	(
+		umask 077
+		for name in $(compgen -e | grep -E '^(DB_|DATABASE_URL$|MINIO_|BACKUP_|ENV$)'); do
+			printf 'export %s=%q\n' "$name" "${!name}"
+		done >"$BACKUP_ENV"
+	)
+	chmod 600 "$BACKUP_ENV"
 	service cron start
 
 	echo "🛠 Setting up backup cron job..."
 	(
-		crontab -l 2>/dev/null | grep -v "$BACKUP_SCRIPT_PATH"
+		crontab -l 2>/dev/null | grep -v "$BACKUP_COMMAND"
 		echo "$BACKUP_CRON"
 	) | crontab -
 
@@ -33,7 +43,5 @@ if [[ "$ENV" == "local" || "$ENV" == "dev" || "$ENV" == "staging" ]]; then
 		--limit-max-requests 10000 --reload
 else
 	echo "🏭 Running in production mode"
-	exec uvicorn src.main:app --host 0.0.0.0 --port 8000 --workers 4 \
-		--timeout-keep-alive 60 --timeout-graceful-shutdown 500 \
-		--limit-max-requests 1000
+	exec env APP_PORT=8000 python -m src.server
 fi
@@ -0,0 +1,4 @@
+#!/bin/bash
+
+echo "🛠 Starting the job worker..."
+exec python -m src.worker
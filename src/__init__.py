@@ -1,4 +1,24 @@
-from .core.database import Database
+import importlib
 
-database = Database()
+from .core.startup import StartupReport
 
+startup = StartupReport()
+
+# Shared clients, built on first access so that a process only imports the
+# modules behind the clients it actually uses.
+SINGLETONS = {
+    "database": ("database", "Database"),
+    "queue": ("queue", "Queue"),
+    "storage": ("storage", "Storage"),
+    "rate_limiter": ("ratelimit", "RateLimiter"),
+    "profiler": ("profiler", "Profiler"),
+}
+
+
+def __getattr__(name):
+    if name not in SINGLETONS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module, cls = SINGLETONS[name]
+    module = importlib.import_module(f".core.{module}", __name__)
+    instance = globals()[name] = getattr(module, cls)()
+    return instance
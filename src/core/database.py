@@ -1,5 +1,6 @@
 import asyncio
 import contextvars
+import time
 from contextlib import asynccontextmanager
 
 import asyncpg
@@ -7,12 +8,17 @@ from decouple import UndefinedValueError, config
 from oguild.logs import Logger
 from oguild.response import Error
 
+from .query_budget import record_query, record_wait
+
 current_connection = contextvars.ContextVar("current_connection", default=None)
 
 
 class Database:
     def __init__(self, database_url=None):
         self.database_url = database_url or self._get_database_url()
+        self.min_size = config("DB_POOL_MIN_SIZE", default=5, cast=int)
+        self.max_size = config("DB_POOL_MAX_SIZE", default=20, cast=int)
+        self.acquire_timeout = config("DB_POOL_TIMEOUT", default=5, cast=float)
         self.logger = Logger("db").get_logger()
 
     def _get_database_url(self):
@@ -37,8 +43,8 @@ class Database:
             try:
                 self.pool = await asyncpg.create_pool(
                     dsn=self.database_url,
-                    min_size=5,
-                    max_size=20,
+                    min_size=self.min_size,
+                    max_size=self.max_size,
                     timeout=30,
                 )
                 self.logger.info("Database pool initialized.")
@@ -73,7 +79,19 @@ class Database:
     async def _get_connection(self):
         connection = None
         try:
-            connection = await self.pool.acquire()
+            started = time.perf_counter()
+            try:
+                connection = await self.pool.acquire(
+                    timeout=self.acquire_timeout
+                )
+            except asyncio.TimeoutError:
+                pass
+            if connection is None:
+                # Fail fast instead of queueing behind a saturated pool.
+                # Raised outside the except block, or Error maps the
+                # TimeoutError to 408.
+                raise Error("Database is busy, try again shortly", 503)
+            record_wait(time.perf_counter() - started)
             yield connection
         finally:
             if connection:
@@ -94,19 +112,23 @@ class Database:
 
     async def _execute_query(self, connection, query, params=None):
         """Helper to execute a query using the given connection."""
-        if "RETURNING" in query.upper():
-            result = (
-                await connection.fetchrow(query, *params)
-                if params
-                else await connection.fetchrow(query)
-            )
-            return dict(result) if result else None
-        else:
-            if params:
-                await connection.execute(query, *params)
+        started = time.perf_counter()
+        try:
+            if "RETURNING" in query.upper():
+                result = (
+                    await connection.fetchrow(query, *params)
+                    if params
+                    else await connection.fetchrow(query)
+                )
+                return dict(result) if result else None
             else:
-                await connection.execute(query)
-            return None
+                if params:
+                    await connection.execute(query, *params)
+                else:
+                    await connection.execute(query)
+                return None
+        finally:
+            record_query(query, time.perf_counter() - started)
 
     async def select(self, query, params=None, format=True):
         """Execute a SELECT query and return results."""
@@ -115,11 +137,15 @@ class Database:
                 self.logger.error("Failed to get a database connection.")
                 return False
 
-            records = (
-                await connection.fetch(query, *params)
-                if params
-                else await connection.fetch(query)
-            )
+            started = time.perf_counter()
+            try:
+                records = (
+                    await connection.fetch(query, *params)
+                    if params
+                    else await connection.fetch(query)
+                )
+            finally:
+                record_query(query, time.perf_counter() - started)
             col_names = records[0].keys() if records else []
 
             if format:
@@ -134,7 +160,7 @@ class Database:
             yield conn
             return
 
-        async with self.pool.acquire() as connection:
+        async with self._get_connection() as connection:
             transaction = connection.transaction()
             await transaction.start()
             token = current_connection.set(connection)
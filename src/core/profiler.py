@@ -0,0 +1,380 @@
+import asyncio
+import contextvars
+import hashlib
+import hmac
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from decouple import config
+from oguild.logs import Logger
+from oguild.response import Error
+
+current_profile = contextvars.ContextVar("current_profile", default=None)
+
+DATABASE_MODULES = ("src.core.database", "asyncpg")
+CATEGORIES = ("middleware", "handler", "database")
+
+
+def frame_label(frame):
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{frame.f_code.co_qualname}"
+
+
+def coroutine_frames(task):
+    """Frames of a task's coroutine chain, outermost first."""
+    frames = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = (
+            getattr(awaitable, "cr_frame", None)
+            or getattr(awaitable, "ag_frame", None)
+            or getattr(awaitable, "gi_frame", None)
+        )
+        if frame is None:
+            break
+        frames.append(frame)
+        awaitable = (
+            getattr(awaitable, "cr_await", None)
+            or getattr(awaitable, "ag_await", None)
+            or getattr(awaitable, "gi_yieldfrom", None)
+        )
+    return frames
+
+
+def running_frames(thread_frame, innermost):
+    """Synchronous frames called from `innermost` on the loop thread."""
+    frames = []
+    frame = thread_frame
+    while frame is not None and frame is not innermost:
+        frames.append(frame)
+        frame = frame.f_back
+    if frame is None:
+        return []
+    return frames[::-1]
+
+
+class Profile:
+    """Samples collected for one profiling session or one request."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self.wall = dict.fromkeys(CATEGORIES, 0.0)
+        self.samples = 0
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def _category(self, frames, scope):
+        endpoint = scope.get("endpoint")
+        handler = getattr(endpoint, "__code__", None)
+        category = "middleware"
+        for frame in frames:
+            module = frame.f_globals.get("__name__", "")
+            if module.startswith(DATABASE_MODULES):
+                return "database"
+            if handler is not None and frame.f_code is handler:
+                category = "handler"
+        return category
+
+    def add(self, task_frames, elapsed):
+        """Record one tick: the frames of every task serving this profile.
+
+        `task_frames` holds a `(frames, scope)` pair per task.
+        """
+        self.samples += 1
+        categories = set()
+        for frames, scope in task_frames:
+            self.stacks[";".join(frame_label(f) for f in frames)] += 1
+            categories.add(self._category(frames, scope))
+        # Each tick is wall time spent once, however many tasks serve it.
+        for category in CATEGORIES[::-1]:
+            if category in categories:
+                self.wall[category] += elapsed
+                break
+
+    def summary(self):
+        end = self.finished or time.perf_counter()
+        return {
+            "samples": self.samples,
+            "interval_ms": self.interval * 1000,
+            "duration_ms": round((end - self.started) * 1000, 3),
+            "wall_ms": {
+                category: round(seconds * 1000, 3)
+                for category, seconds in self.wall.items()
+            },
+        }
+
+    def collapsed(self):
+        """Stacks in collapsed format for flamegraph.pl or speedscope."""
+        return "".join(
+            f"{stack} {count}\n"
+            for stack, count in self.stacks.most_common()
+            if stack
+        )
+
+
+class Profiler:
+    """Statistical sampler of the asyncio tasks serving profiled requests.
+
+    A background thread wakes every `interval` seconds while any profile
+    is active and walks the coroutine chain of each task whose context
+    carries a profile, plus the synchronous frames of the running task.
+    Child tasks (e.g. BaseHTTPMiddleware's `call_next`) inherit the
+    context, so time spent there is attributed to the same request.
+    """
+
+    def __init__(self, interval=None, output_dir=None):
+        self.interval = interval or config(
+            "PROFILER_INTERVAL_MS", default=5, cast=float
+        ) / 1000
+        self.output_dir = Path(
+            output_dir or config("PROFILER_DIR", default="storage/profiles")
+        )
+        self.max_files = config("PROFILER_MAX_FILES", default=100, cast=int)
+        self.admin_token = config("PROFILER_TOKEN", default="")
+        self.secret = config(
+            "PROFILER_SECRET", default=config("SECRET_KEY", default="")
+        ).encode()
+        self.active = set()
+        self.redis = None
+        self.used = {}
+        self.sample_failed = False
+        self.worker_profile = None
+        self.thread = None
+        self.lock = threading.Lock()
+        self.logger = Logger("profiler").get_logger()
+
+    async def initialize(self, redis=None):
+        """Share a Redis client so each signed request is accepted once
+        across all workers rather than once per worker.
+        """
+        self.redis = redis
+
+    async def close(self):
+        self.redis = None
+
+    def start(self, interval=None):
+        """Begin a profile and make sure the sampler thread is running."""
+        profile = Profile(interval or self.interval)
+        with self.lock:
+            self.active.add(profile)
+            if self.thread is None:
+                self.loop = asyncio.get_running_loop()
+                self.loop_thread = threading.get_ident()
+                self.thread = threading.Thread(
+                    target=self._sample, name="profiler", daemon=True
+                )
+                self.thread.start()
+        return profile
+
+    def stop(self, profile):
+        profile.finished = time.perf_counter()
+        with self.lock:
+            self.active.discard(profile)
+
+    def _sample(self):
+        last = time.perf_counter()
+        while True:
+            with self.lock:
+                active = set(self.active)
+                if not active:
+                    self.thread = None
+                    return
+            time.sleep(min(profile.interval for profile in active))
+            now = time.perf_counter()
+            try:
+                self._tick(active, now - last)
+            except Exception as e:
+                if self.sample_failed:
+                    self.logger.debug(f"Dropped profiler sample: {e}")
+                else:
+                    # Usually an unsupported runtime; profiles will be empty.
+                    self.sample_failed = True
+                    self.logger.warning(f"Profiler sampling failed: {e}")
+            last = now
+
+    def _tick(self, active, elapsed):
+        thread_frame = sys._current_frames().get(self.loop_thread)
+        running = getattr(asyncio.tasks, "_current_tasks", {}).get(self.loop)
+        by_profile = {}
+        for task in asyncio.all_tasks(self.loop):
+            entry = task.get_context().get(current_profile)
+            if entry is None or entry[0] not in active:
+                continue
+            profile, scope = entry
+            frames = coroutine_frames(task)
+            if task is running and frames:
+                frames += running_frames(thread_frame, frames[-1])
+            by_profile.setdefault(profile, []).append((frames, scope))
+
+        for profile, task_frames in by_profile.items():
+            profile.add(task_frames, elapsed)
+
+    async def profile_worker(self, seconds):
+        """Profile every request this worker serves for `seconds`."""
+        if self.worker_profile is not None:
+            raise Error("A profile is already running in this worker", 409)
+        self.worker_profile = profile = self.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            self.stop(profile)
+            self.worker_profile = None
+        path = self.path_for(profile, "worker")
+        self.save(profile, path)
+        return profile, path
+
+    def path_for(self, profile, kind):
+        return self.output_dir / (
+            f"{kind}-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S')}"
+            f"-{id(profile):x}.collapsed"
+        )
+
+    def save(self, profile, path):
+        """Write the collapsed stacks of a profile to `path`, keeping only
+        the newest `max_files` profiles.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(profile.collapsed())
+        files = sorted(
+            path.parent.glob("*.collapsed"),
+            key=lambda file: file.stat().st_mtime,
+        )
+        for old in files[: max(0, len(files) - self.max_files)]:
+            old.unlink(missing_ok=True)
+
+    def authorize_admin(self, token):
+        """Reject admin calls unless PROFILER_TOKEN is set and matches."""
+        if not self.admin_token:
+            raise Error("Not Found", 404)
+        if not token or not hmac.compare_digest(token, self.admin_token):
+            raise Error("Invalid admin token", 403)
+
+    def _digest(self, expires, nonce, method, path):
+        message = f"{expires}.{nonce}.{method.upper()}.{path}".encode()
+        return hmac.new(self.secret, message, hashlib.sha256).hexdigest()
+
+    def sign(self, method, path, ttl=300):
+        """Return an `X-Profile-Request` header value for one request to
+        `method` `path` within `ttl` seconds.
+        """
+        expires = str(int(time.time()) + ttl)
+        nonce = os.urandom(8).hex()
+        signature = self._digest(expires, nonce, method, path)
+        return f"{expires}.{nonce}.{signature}"
+
+    async def verify(self, value, method, path):
+        """Accept a signed value once, for the method and path it names."""
+        expires, nonce, signature = (value.split(".") + ["", ""])[:3]
+        now = time.time()
+        if not expires.isdigit() or int(expires) < now:
+            return False
+        if not hmac.compare_digest(
+            signature, self._digest(expires, nonce, method, path)
+        ):
+            return False
+        return await self._claim(signature, int(expires), now)
+
+    async def _claim(self, signature, expires, now):
+        if self.redis is not None:
+            try:
+                return bool(
+                    await self.redis.set(
+                        f"profiler:used:{signature}",
+                        1,
+                        nx=True,
+                        ex=max(1, math.ceil(expires - now)),
+                    )
+                )
+            except Exception as e:
+                # Refuse rather than risk accepting a replayed value.
+                self.logger.warning(f"Could not claim profile request: {e}")
+                return False
+
+        self.used = {
+            key: until for key, until in self.used.items() if until >= now
+        }
+        if signature in self.used:
+            return False
+        self.used[signature] = expires
+        return True
+
+
+class ProfilerMiddleware:
+    """Attach requests to the active worker profile, or profile a single
+    request carrying a valid signed `X-Profile-Request` header.
+
+    Profiled requests get `X-Profile-Path` (the file name in PROFILER_DIR)
+    and a `Server-Timing` header splitting their wall time across
+    middleware, handler and database.
+    """
+
+    def __init__(self, app, profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        signed = None
+        for header, value in scope["headers"]:
+            if header == b"x-profile-request":
+                signed = value.decode()
+                break
+
+        if signed is None or not await self.profiler.verify(
+            signed, scope["method"], scope["path"]
+        ):
+            if self.profiler.worker_profile is None:
+                await self.app(scope, receive, send)
+                return
+            token = current_profile.set(
+                (self.profiler.worker_profile, scope)
+            )
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                current_profile.reset(token)
+            return
+
+        profile = self.profiler.start(interval=0.001)
+        path = self.profiler.path_for(profile, "request")
+        token = current_profile.set((profile, scope))
+
+        async def send_with_profile(message):
+            if message["type"] == "http.response.start":
+                wall = profile.summary()["wall_ms"]
+                timing = ", ".join(
+                    f"prof-{category};dur={duration}"
+                    for category, duration in wall.items()
+                )
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", timing.encode()),
+                    (b"x-profile-path", path.name.encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            current_profile.reset(token)
+            self.profiler.stop(profile)
+            self.profiler.save(profile, path)
+            self.profiler.logger.info(
+                f"Profiled {scope['method']} {scope['path']}: "
+                f"{profile.summary()} -> {path}"
+            )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.exit("usage: python -m src.core.profiler METHOD PATH [TTL]")
+    ttl = int(sys.argv[3]) if len(sys.argv) > 3 else 300
+    print(Profiler().sign(sys.argv[1], sys.argv[2], ttl))
@@ -0,0 +1,141 @@
+import contextvars
+from collections import Counter
+
+from oguild.logs import Logger
+
+current_queries = contextvars.ContextVar("current_queries", default=None)
+
+
+def record_query(query, elapsed):
+    """Count a query against the current request, if one is tracked."""
+    stats = current_queries.get()
+    if stats is not None:
+        stats.record(query, elapsed)
+
+
+def record_wait(elapsed):
+    """Count time spent waiting for a pool connection."""
+    stats = current_queries.get()
+    if stats is not None:
+        stats.wait += elapsed
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryStats:
+    """Queries run while serving one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.wait = 0.0
+        self.statements = Counter()
+
+    def record(self, query, elapsed):
+        self.count += 1
+        self.time += elapsed
+        self.statements[" ".join(query.split())] += 1
+
+    def most_repeated(self):
+        """Return the statement run most often and how many times."""
+        if not self.statements:
+            return None, 0
+        return self.statements.most_common(1)[0]
+
+    def server_timing(self):
+        return (
+            f'db;dur={self.time * 1000:.2f};desc="{self.count} queries", '
+            f"db-wait;dur={self.wait * 1000:.2f}"
+        )
+
+
+class Budget:
+    """Limits for one request; `None` disables a limit."""
+
+    def __init__(self, max_queries=None, max_db_ms=None, max_repeats=None):
+        self.max_queries = max_queries
+        self.max_db_ms = max_db_ms
+        self.max_repeats = max_repeats
+
+    def violations(self, stats):
+        violations = []
+        if self.max_queries is not None and stats.count > self.max_queries:
+            violations.append(
+                f"{stats.count} queries (budget {self.max_queries})"
+            )
+        if (
+            self.max_db_ms is not None
+            and stats.time * 1000 > self.max_db_ms
+        ):
+            violations.append(
+                f"{stats.time * 1000:.1f}ms in the database "
+                f"(budget {self.max_db_ms}ms)"
+            )
+        statement, repeats = stats.most_repeated()
+        if self.max_repeats is not None and repeats > self.max_repeats:
+            violations.append(
+                f"statement repeated {repeats} times, likely N+1 "
+                f"(budget {self.max_repeats}): {statement[:200]}"
+            )
+        return violations
+
+
+class QueryBudgetMiddleware:
+    """Track the queries each request makes and enforce query budgets.
+
+    Every response gets a `Server-Timing` header with the query count,
+    database time and pool wait. `routes` maps path prefixes to budgets;
+    the longest matching prefix wins and `default` applies to everything
+    else. Violations are logged, or raised as QueryBudgetExceeded when
+    `strict` is set so that tests fail on new N+1 patterns.
+    """
+
+    def __init__(self, app, default=None, routes=None, strict=False):
+        self.app = app
+        self.default = default
+        self.routes = sorted(
+            (routes or {}).items(), key=lambda item: len(item[0]), reverse=True
+        )
+        self.strict = strict
+        self.logger = Logger("query_budget").get_logger()
+
+    def _match(self, path):
+        for prefix, budget in self.routes:
+            if path.startswith(prefix):
+                return budget
+        return self.default
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = current_queries.set(stats)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", stats.server_timing().encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_queries.reset(token)
+
+        budget = self._match(scope["path"])
+        violations = budget.violations(stats) if budget else []
+        if not violations:
+            return
+
+        message = (
+            f"{scope['method']} {scope['path']} exceeded its query budget: "
+            + "; ".join(violations)
+        )
+        if self.strict:
+            raise QueryBudgetExceeded(message)
+        self.logger.warning(message)
@@ -0,0 +1,515 @@
+import asyncio
+import heapq
+import inspect
+import json
+import time
+import uuid
+from collections import deque
+
+from decouple import config
+from oguild.logs import Logger
+
+from .redis_client import create_redis
+
+PRIORITIES = ("high", "default", "low")
+
+PROMOTE_SCRIPT = """
+local function split(member)
+    local sep = string.find(member, ':', 1, true)
+    return string.sub(member, 1, sep - 1), string.sub(member, sep + 1)
+end
+
+local queued = 0
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1],
+                       'LIMIT', 0, tonumber(ARGV[2]))
+for _, member in ipairs(due) do
+    local lane, job_id = split(member)
+    redis.call('LPUSH', ARGV[3] .. lane, job_id)
+    redis.call('ZREM', KEYS[1], member)
+    queued = queued + 1
+end
+
+-- Jobs whose worker stopped heartbeating are requeued, or reported back
+-- as failed once they have used up their retries.
+local failed = {}
+local stale = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1],
+                         'LIMIT', 0, tonumber(ARGV[2]))
+for _, member in ipairs(stale) do
+    local lane, job_id = split(member)
+    local payload = redis.call('GET', ARGV[4] .. job_id)
+    if payload then
+        local job = cjson.decode(payload)
+        if job['attempts'] > job['max_retries'] then
+            table.insert(failed, job_id)
+        else
+            redis.call('LPUSH', ARGV[3] .. lane, job_id)
+            queued = queued + 1
+        end
+    end
+    redis.call('ZREM', KEYS[2], member)
+end
+
+if queued > 0 then
+    redis.call('LPUSH', KEYS[3], queued)
+    redis.call('LTRIM', KEYS[3], 0, 99)
+end
+return failed
+"""
+
+POP_SCRIPT = """
+for i = 2, #KEYS do
+    local job_id = redis.call('RPOP', KEYS[i])
+    if job_id then
+        redis.call('ZADD', KEYS[1], ARGV[1], ARGV[i] .. ':' .. job_id)
+        return job_id
+    end
+end
+return false
+"""
+
+
+class MemoryBackend:
+    """In-process backend used by tests and single-process development."""
+
+    def __init__(self):
+        self.lanes = {priority: deque() for priority in PRIORITIES}
+        self.delayed = []
+        self.jobs = {}
+        self.available = None
+
+    async def connect(self):
+        self.available = asyncio.Condition()
+
+    async def close(self):
+        self.available = None
+
+    async def push(self, job, run_at=None):
+        self.jobs[job["id"]] = json.dumps(job)
+        if run_at and run_at > time.time():
+            heapq.heappush(self.delayed, (run_at, job["priority"], job["id"]))
+            return
+
+        async with self.available:
+            self.lanes[job["priority"]].append(job["id"])
+            self.available.notify()
+
+    async def promote(self, now, limit=100):
+        moved = 0
+        async with self.available:
+            while self.delayed and self.delayed[0][0] <= now and moved < limit:
+                _, priority, job_id = heapq.heappop(self.delayed)
+                self.lanes[priority].append(job_id)
+                moved += 1
+            if moved:
+                self.available.notify(moved)
+        # Jobs cannot outlive the process that runs them, so none go stale.
+        return []
+
+    async def pop(self, timeout, visibility_timeout=None):
+        async with self.available:
+            try:
+                await asyncio.wait_for(
+                    self.available.wait_for(
+                        lambda: any(self.lanes.values())
+                    ),
+                    timeout,
+                )
+            except asyncio.TimeoutError:
+                return None
+
+            for priority in PRIORITIES:
+                if self.lanes[priority]:
+                    job_id = self.lanes[priority].popleft()
+                    return json.loads(self.jobs[job_id])
+
+    async def ack(self, job):
+        pass
+
+    async def touch(self, jobs, deadline):
+        pass
+
+    async def save(self, job, ttl=None):
+        self.jobs[job["id"]] = json.dumps(job)
+
+    async def load(self, job_id):
+        payload = self.jobs.get(job_id)
+        return json.loads(payload) if payload else None
+
+
+class RedisBackend:
+    """Backend storing lanes, delayed jobs and results in Redis.
+
+    Popped jobs move to a `processing` sorted set scored by a visibility
+    deadline that the worker extends while the job runs. If the worker
+    dies, `promote` requeues the job once the deadline passes, so jobs
+    are delivered at least once.
+    """
+
+    def __init__(self, redis_url=None, prefix="jobs"):
+        self.redis_url = redis_url
+        self.prefix = prefix
+        self.redis = None
+        self.delayed_key = f"{prefix}:delayed"
+        self.processing_key = f"{prefix}:processing"
+        self.notify_key = f"{prefix}:notify"
+        self.lane_keys = [f"{prefix}:lane:{p}" for p in PRIORITIES]
+
+    def _job_key(self, job_id):
+        return f"{self.prefix}:job:{job_id}"
+
+    def _member(self, job):
+        return f"{job['priority']}:{job['id']}"
+
+    async def connect(self):
+        if self.redis is None:
+            self.redis = create_redis(self.redis_url)
+            self._promote = self.redis.register_script(PROMOTE_SCRIPT)
+            self._pop = self.redis.register_script(POP_SCRIPT)
+        await self.redis.ping()
+
+    async def close(self):
+        if self.redis:
+            await self.redis.aclose()
+            self.redis = None
+
+    async def push(self, job, run_at=None):
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(self._job_key(job["id"]), json.dumps(job))
+            if run_at and run_at > time.time():
+                pipe.zadd(self.delayed_key, {self._member(job): run_at})
+            else:
+                pipe.lpush(f"{self.prefix}:lane:{job['priority']}", job["id"])
+                pipe.lpush(self.notify_key, 1)
+                pipe.ltrim(self.notify_key, 0, 99)
+            await pipe.execute()
+
+    async def promote(self, now, limit=100):
+        """Queue due delayed jobs and requeue abandoned ones.
+
+        Returns the ids of abandoned jobs that have no retries left.
+        """
+        failed = await self._promote(
+            keys=[self.delayed_key, self.processing_key, self.notify_key],
+            args=[now, limit, f"{self.prefix}:lane:", self._job_key("")],
+        )
+        return [job_id.decode() for job_id in failed]
+
+    async def _pop_job(self, visibility_timeout):
+        # Lanes are tried in priority order.
+        job_id = await self._pop(
+            keys=[self.processing_key] + self.lane_keys,
+            args=[time.time() + visibility_timeout] + list(PRIORITIES),
+        )
+        return job_id.decode() if job_id else None
+
+    async def pop(self, timeout, visibility_timeout=60):
+        job_id = await self._pop_job(visibility_timeout)
+        if job_id is None:
+            # Nothing queued: block until a push signals new work.
+            signal = await self.redis.brpop([self.notify_key], timeout=timeout)
+            if signal is None:
+                return None
+            job_id = await self._pop_job(visibility_timeout)
+            if job_id is None:
+                return None
+        return await self.load(job_id)
+
+    async def ack(self, job):
+        """Mark a popped job as handled so it is not requeued."""
+        await self.redis.zrem(self.processing_key, self._member(job))
+
+    async def touch(self, jobs, deadline):
+        """Extend the visibility deadline of jobs that are still running."""
+        if jobs:
+            await self.redis.zadd(
+                self.processing_key,
+                {self._member(job): deadline for job in jobs},
+                xx=True,
+            )
+
+    async def save(self, job, ttl=None):
+        await self.redis.set(self._job_key(job["id"]), json.dumps(job), ex=ttl)
+
+    async def load(self, job_id):
+        payload = await self.redis.get(self._job_key(job_id))
+        return json.loads(payload) if payload else None
+
+
+class Task:
+    def __init__(
+        self, queue, func, name, priority, max_retries, retry_delay, timeout
+    ):
+        self.queue = queue
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    async def enqueue(self, *args, **kwargs):
+        """Enqueue the task with its default options."""
+        return await self.queue.enqueue(self.name, args=args, kwargs=kwargs)
+
+    async def enqueue_with(
+        self, args=(), kwargs=None, priority=None, delay=0, max_retries=None
+    ):
+        """Enqueue the task overriding priority, delay or retries."""
+        return await self.queue.enqueue(
+            self.name,
+            args=args,
+            kwargs=kwargs,
+            priority=priority,
+            delay=delay,
+            max_retries=max_retries,
+        )
+
+
+class Queue:
+    def __init__(self, backend=None, result_ttl=None):
+        backend = backend or config("QUEUE_BACKEND", default="redis")
+        if backend == "memory":
+            backend = MemoryBackend()
+        elif backend == "redis":
+            backend = RedisBackend()
+        self.backend = backend
+        self.result_ttl = result_ttl or config(
+            "QUEUE_RESULT_TTL", default=86400, cast=int
+        )
+        self.tasks = {}
+        self.logger = Logger("queue").get_logger()
+
+    async def initialize(self, retries=20, delay=20):
+        """Connect the queue backend on startup with retry logic."""
+        for attempt in range(1, retries + 1):
+            try:
+                await self.backend.connect()
+                self.logger.info("Job queue initialized.")
+                return
+            except Exception as e:
+                self.logger.warning(
+                    f"[Attempt {attempt}/{retries}] Queue not ready yet: {e}"
+                )
+            await asyncio.sleep(delay)
+
+        await self.backend.close()
+        self.logger.critical("Queue initialization failed after retries.")
+        raise RuntimeError("Failed to initialize job queue after retries.")
+
+    async def close(self):
+        """Close the queue backend on shutdown."""
+        await self.backend.close()
+        self.logger.info("Job queue closed.")
+
+    def task(
+        self,
+        name=None,
+        priority="default",
+        max_retries=3,
+        retry_delay=5,
+        timeout=None,
+    ):
+        """Register a function as a task the worker can run."""
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+
+        def decorator(func):
+            task = Task(
+                self,
+                func,
+                name or f"{func.__module__}.{func.__qualname__}",
+                priority,
+                max_retries,
+                retry_delay,
+                timeout,
+            )
+            self.tasks[task.name] = task
+            return task
+
+        return decorator
+
+    async def enqueue(
+        self,
+        name,
+        args=(),
+        kwargs=None,
+        priority=None,
+        delay=0,
+        max_retries=None,
+    ):
+        """Enqueue a registered task and return its job id."""
+        task = self.tasks.get(name)
+        if task is None:
+            raise ValueError(f"Unknown task: {name}")
+
+        priority = priority or task.priority
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}")
+
+        job = {
+            "id": uuid.uuid4().hex,
+            "name": name,
+            "args": list(args),
+            "kwargs": kwargs or {},
+            "priority": priority,
+            "max_retries": (
+                task.max_retries if max_retries is None else max_retries
+            ),
+            "attempts": 0,
+            "status": "scheduled" if delay else "queued",
+            "result": None,
+            "error": None,
+            "enqueued_at": time.time(),
+        }
+        run_at = time.time() + delay if delay else None
+        await self.backend.push(job, run_at=run_at)
+        return job["id"]
+
+    async def get_job(self, job_id):
+        """Return the stored state of a job, or None if it expired."""
+        return await self.backend.load(job_id)
+
+    async def result(self, job_id, timeout=None, interval=0.5):
+        """Wait for a job to finish and return its final state."""
+        deadline = time.monotonic() + timeout if timeout else None
+        while True:
+            job = await self.backend.load(job_id)
+            if job is None or job["status"] in ("complete", "failed"):
+                return job
+            if deadline and time.monotonic() >= deadline:
+                return job
+            await asyncio.sleep(interval)
+
+
+class Worker:
+    def __init__(
+        self, queue, concurrency=10, poll_interval=1.0, visibility_timeout=60
+    ):
+        self.queue = queue
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.visibility_timeout = visibility_timeout
+        self.in_flight = set()
+        self.running = {}
+        self.stopping = False
+        self.logger = Logger("worker").get_logger()
+
+    def stop(self):
+        """Stop fetching new jobs; running jobs are allowed to finish."""
+        self.stopping = True
+
+    async def run(self):
+        """Fetch and run jobs until stopped, at most `concurrency` at once."""
+        slots = asyncio.Semaphore(self.concurrency)
+        backend = self.queue.backend
+        heartbeat = asyncio.create_task(self._heartbeat())
+
+        while not self.stopping:
+            await slots.acquire()
+            try:
+                for job_id in await backend.promote(time.time()):
+                    await self._abandoned(job_id)
+                job = await backend.pop(
+                    self.poll_interval, self.visibility_timeout
+                )
+            except Exception as e:
+                slots.release()
+                self.logger.error(f"Failed to fetch job: {e}")
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            if job is None:
+                slots.release()
+                continue
+
+            task = asyncio.create_task(self._process(job))
+            self.in_flight.add(task)
+            task.add_done_callback(self.in_flight.discard)
+            task.add_done_callback(lambda _: slots.release())
+
+        if self.in_flight:
+            self.logger.info(f"Waiting for {len(self.in_flight)} jobs.")
+            await asyncio.gather(*self.in_flight, return_exceptions=True)
+        heartbeat.cancel()
+
+    async def _heartbeat(self):
+        """Keep the visibility deadline of running jobs in the future."""
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 3)
+            try:
+                await self.queue.backend.touch(
+                    list(self.running.values()),
+                    time.time() + self.visibility_timeout,
+                )
+            except Exception as e:
+                self.logger.error(f"Failed to extend running jobs: {e}")
+
+    async def _abandoned(self, job_id):
+        job = await self.queue.backend.load(job_id)
+        if job is None:
+            return
+        job["status"] = "failed"
+        job["error"] = "Worker stopped while running the job"
+        self.logger.error(f"Job {job['name']} ({job_id}) was abandoned")
+        await self.queue.backend.save(job, ttl=self.queue.result_ttl)
+
+    async def _process(self, job):
+        self.running[job["id"]] = job
+        try:
+            await self._run(job)
+        finally:
+            del self.running[job["id"]]
+        await self.queue.backend.ack(job)
+
+    async def _run(self, job):
+        task = self.queue.tasks.get(job["name"])
+        if task is None:
+            job["status"] = "failed"
+            job["error"] = f"Unknown task: {job['name']}"
+            self.logger.error(job["error"])
+            await self.queue.backend.save(job, ttl=self.queue.result_ttl)
+            return
+
+        job["attempts"] += 1
+        job["status"] = "running"
+        await self.queue.backend.save(job)
+
+        started = time.perf_counter()
+        try:
+            result = await self._call(task, job)
+            json.dumps(result)
+        except Exception as e:
+            job["error"] = repr(e)
+            if job["attempts"] <= job["max_retries"]:
+                backoff = task.retry_delay * 2 ** (job["attempts"] - 1)
+                job["status"] = "retrying"
+                self.logger.warning(
+                    f"[Attempt {job['attempts']}/{job['max_retries'] + 1}]"
+                    f" Job {job['name']} ({job['id']}) failed: {e}."
+                    f" Retrying in {backoff}s"
+                )
+                run_at = time.time() + backoff
+                await self.queue.backend.push(job, run_at=run_at)
+                return
+
+            job["status"] = "failed"
+            self.logger.error(f"Job {job['name']} ({job['id']}) failed: {e}")
+        else:
+            job["status"] = "complete"
+            job["result"] = result
+            job["error"] = None
+
+        job["duration"] = time.perf_counter() - started
+        await self.queue.backend.save(job, ttl=self.queue.result_ttl)
+
+    async def _call(self, task, job):
+        if inspect.iscoroutinefunction(task.func):
+            call = task.func(*job["args"], **job["kwargs"])
+        else:
+            call = asyncio.to_thread(task.func, *job["args"], **job["kwargs"])
+        if task.timeout:
+            return await asyncio.wait_for(call, task.timeout)
+        return await call
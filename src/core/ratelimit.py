@@ -0,0 +1,334 @@
+import asyncio
+import math
+import time
+
+from fastapi.responses import JSONResponse
+from oguild.logs import Logger
+
+from .redis_client import create_redis
+
+SLIDING_WINDOW_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local index = math.floor(now / window)
+local current_key = KEYS[1] .. ':' .. index
+local previous_key = KEYS[1] .. ':' .. (index - 1)
+local current = tonumber(redis.call('GET', current_key) or '0')
+local previous = tonumber(redis.call('GET', previous_key) or '0')
+local elapsed = now % window
+local weighted = previous * (window - elapsed) / window + current
+if weighted + 1 > limit then
+    return {0, 0, window - elapsed}
+end
+redis.call('INCR', current_key)
+redis.call('PEXPIRE', current_key, window * 2)
+return {1, math.floor(limit - weighted - 1), 0}
+"""
+
+TOKEN_BUCKET_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) * 1000 + math.floor(tonumber(now[2]) / 1000)
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry = math.ceil((1 - tokens) / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate))
+return {allowed, math.floor(tokens), retry}
+"""
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def client_ip(scope):
+    """Key requests by client address.
+
+    Behind a reverse proxy this is the proxy's address unless the proxy is
+    listed in FORWARDED_ALLOW_IPS, so that uvicorn applies its
+    X-Forwarded-For header.
+    """
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def header_key(name, fallback=client_ip):
+    """Key requests by a header such as an API key, else by fallback."""
+    name = name.lower().encode()
+
+    def key(scope):
+        for header, value in scope["headers"]:
+            if header == name:
+                return value.decode()
+        return fallback(scope)
+
+    return key
+
+
+class Policy:
+    def __init__(
+        self,
+        limit,
+        period,
+        algorithm="sliding_window",
+        key=client_ip,
+        burst=None,
+        name=None,
+    ):
+        if algorithm not in ("sliding_window", "token_bucket"):
+            raise ValueError(f"Unknown rate limit algorithm: {algorithm}")
+        self.limit = limit
+        self.period = period
+        self.algorithm = algorithm
+        self.key = key
+        self.burst = burst or limit
+        self.name = name or f"{limit}-{period}"
+
+    @classmethod
+    def parse(cls, value, **kwargs):
+        """Build a policy from a string such as `100/minute`."""
+        limit, _, period = value.partition("/")
+        return cls(int(limit), PERIODS[period.strip()], **kwargs)
+
+
+class LocalLimiter:
+    """In-process limiter used when Redis is not reachable."""
+
+    def __init__(self, max_keys=100000):
+        self.windows = {}
+        self.buckets = {}
+        self.max_keys = max_keys
+
+    def hit(self, policy, key):
+        now = time.monotonic() * 1000
+        if policy.algorithm == "token_bucket":
+            return self._token_bucket(policy, key, now)
+        return self._sliding_window(policy, key, now)
+
+    def _sliding_window(self, policy, key, now):
+        window = policy.period * 1000
+        index = int(now // window)
+        current_index, current, previous = self.windows.get(
+            key, (index, 0, 0)
+        )
+        if current_index != index:
+            previous = current if current_index == index - 1 else 0
+            current = 0
+
+        elapsed = now % window
+        weighted = previous * (window - elapsed) / window + current
+        if weighted + 1 > policy.limit:
+            self._store(self.windows, key, (index, current, previous))
+            return False, 0, window - elapsed
+
+        self._store(self.windows, key, (index, current + 1, previous))
+        return True, math.floor(policy.limit - weighted - 1), 0
+
+    def _token_bucket(self, policy, key, now):
+        rate = policy.limit / (policy.period * 1000)
+        tokens, ts = self.buckets.get(key, (policy.burst, now))
+        tokens = min(policy.burst, tokens + (now - ts) * rate)
+        if tokens >= 1:
+            self._store(self.buckets, key, (tokens - 1, now))
+            return True, math.floor(tokens - 1), 0
+
+        self._store(self.buckets, key, (tokens, now))
+        return False, 0, math.ceil((1 - tokens) / rate)
+
+    def _store(self, table, key, value):
+        if key not in table and len(table) >= self.max_keys:
+            # Dicts keep insertion order, so this drops the oldest key.
+            del table[next(iter(table))]
+        table[key] = value
+
+
+class RateLimiter:
+    def __init__(self, redis_url=None, prefix="ratelimit", retry_after=30):
+        self.redis_url = redis_url
+        self.prefix = prefix
+        self.retry_after = retry_after
+        self.redis = None
+        self.local = LocalLimiter()
+        self.redis_down_until = 0
+        self.logger = Logger("ratelimit").get_logger()
+
+    async def initialize(self):
+        """Connect to Redis; the local limiter is used until it is up."""
+        self.redis = create_redis(
+            self.redis_url, socket_timeout=0.25, socket_connect_timeout=0.25
+        )
+        self._sliding_window = self.redis.register_script(
+            SLIDING_WINDOW_SCRIPT
+        )
+        self._token_bucket = self.redis.register_script(TOKEN_BUCKET_SCRIPT)
+        self.logger.info("Rate limiter initialized.")
+
+    async def close(self):
+        if self.redis:
+            await self.redis.aclose()
+            self.redis = None
+            self.logger.info("Rate limiter closed.")
+
+    async def hit(self, policy, key):
+        """Record a request and return (allowed, remaining, retry_ms)."""
+        if self.redis is None or time.monotonic() < self.redis_down_until:
+            return self.local.hit(policy, key)
+
+        redis_key = f"{self.prefix}:{policy.name}:{key}"
+        try:
+            if policy.algorithm == "token_bucket":
+                rate = policy.limit / (policy.period * 1000)
+                result = await self._token_bucket(
+                    keys=[redis_key], args=[policy.burst, rate]
+                )
+            else:
+                result = await self._sliding_window(
+                    keys=[redis_key],
+                    args=[policy.limit, policy.period * 1000],
+                )
+        except Exception as e:
+            self.logger.warning(
+                f"Redis rate limiting unavailable, using local limits: {e}"
+            )
+            self.redis_down_until = time.monotonic() + self.retry_after
+            return self.local.hit(policy, key)
+
+        allowed, remaining, retry_ms = result
+        return bool(allowed), remaining, retry_ms
+
+
+class RateLimitMiddleware:
+    """Reject requests over their policy with 429 before any work is done.
+
+    `routes` maps path prefixes to policies; the longest matching prefix
+    wins and `default` applies to everything else.
+    """
+
+    def __init__(self, app, limiter, default=None, routes=None, exempt=()):
+        self.app = app
+        self.limiter = limiter
+        self.default = default
+        self.routes = sorted(
+            (routes or {}).items(), key=lambda item: len(item[0]), reverse=True
+        )
+        self.exempt = tuple(exempt)
+
+    def _match(self, path):
+        for prefix, policy in self.routes:
+            if path.startswith(prefix):
+                return policy
+        return self.default
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt):
+            await self.app(scope, receive, send)
+            return
+
+        policy = self._match(scope["path"])
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        allowed, remaining, retry_ms = await self.limiter.hit(
+            policy, policy.key(scope)
+        )
+        headers = {
+            "X-RateLimit-Limit": str(policy.limit),
+            "X-RateLimit-Remaining": str(max(remaining, 0)),
+        }
+        if not allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(retry_ms / 1000)))
+            response = JSONResponse(
+                content={"message": "Too many requests"},
+                status_code=429,
+                headers=headers,
+            )
+            await response(scope, receive, send)
+            return
+
+        raw_headers = [
+            (name.lower().encode(), value.encode())
+            for name, value in headers.items()
+        ]
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", []))
+                message["headers"].extend(raw_headers)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+
+class ConcurrencyLimitMiddleware:
+    """Cap in-flight requests per worker and shed the excess with 503.
+
+    Requests wait up to `wait_timeout` seconds for a slot; once
+    `max_waiting` requests are already queued, new ones are rejected
+    immediately so latency stays bounded under overload.
+    """
+
+    def __init__(
+        self,
+        app,
+        max_in_flight,
+        max_waiting=None,
+        wait_timeout=0.5,
+        exempt=(),
+    ):
+        self.app = app
+        self.slots = asyncio.Semaphore(max_in_flight)
+        self.max_waiting = (
+            max_in_flight if max_waiting is None else max_waiting
+        )
+        self.wait_timeout = wait_timeout
+        self.exempt = tuple(exempt)
+        self.waiting = 0
+        self.logger = Logger("ratelimit").get_logger()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt):
+            await self.app(scope, receive, send)
+            return
+
+        if self.slots.locked():
+            if self.waiting >= self.max_waiting:
+                await self._shed(scope, receive, send)
+                return
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(
+                    self.slots.acquire(), self.wait_timeout
+                )
+            except asyncio.TimeoutError:
+                await self._shed(scope, receive, send)
+                return
+            finally:
+                self.waiting -= 1
+        else:
+            await self.slots.acquire()
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.slots.release()
+
+    async def _shed(self, scope, receive, send):
+        self.logger.warning(f"Shedding {scope['path']}: server overloaded")
+        response = JSONResponse(
+            content={"message": "Server is busy, try again shortly"},
+            status_code=503,
+            headers={"Retry-After": "1"},
+        )
+        await response(scope, receive, send)
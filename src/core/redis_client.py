@@ -0,0 +1,27 @@
+from decouple import UndefinedValueError, config
+
+
+def get_redis_url():
+    try:
+        return config("REDIS_URL")
+    except UndefinedValueError:
+        redis_host = config("REDIS_HOST", default="redis")
+        redis_port = config("REDIS_PORT", default=6379, cast=int)
+        redis_password = config("REDIS_PASSWORD", default="")
+        redis_db = config("REDIS_DB", default=0, cast=int)
+
+        password_part = f":{redis_password}@" if redis_password else ""
+        return f"redis://{password_part}{redis_host}:{redis_port}/{redis_db}"
+
+
+def create_redis(redis_url=None, max_connections=50, **kwargs):
+    """Create a pooled async Redis client for the compose Redis service."""
+    # Imported on first use; the server warms it before forking workers.
+    from redis import asyncio as aioredis
+
+    return aioredis.from_url(
+        redis_url or get_redis_url(),
+        max_connections=max_connections,
+        health_check_interval=30,
+        **kwargs,
+    )
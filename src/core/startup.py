@@ -0,0 +1,145 @@
+import os
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class TimedLoader:
+    """Loader wrapper that reports how long a module took to load."""
+
+    def __init__(self, loader, timer):
+        self.loader = loader
+        self.timer = timer
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+    def create_module(self, spec):
+        # Extension modules do most of their work here, so start timing now.
+        self.timer.enter()
+        try:
+            return self.loader.create_module(spec)
+        except BaseException:
+            self.timer.exit(spec.name)
+            raise
+
+    def exec_module(self, module):
+        # Hand the real loader back so nothing keeps a reference to us.
+        module.__loader__ = module.__spec__.loader = self.loader
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.timer.exit(module.__spec__.name)
+
+
+class ImportTimer:
+    """Meta path finder recording the self and cumulative load time of every
+    module imported while it is installed, like `python -X importtime`.
+    """
+
+    def __init__(self):
+        self.modules = {}
+        self.stack = []
+
+    def install(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, name, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        if hasattr(spec.loader, "exec_module"):
+            spec.loader = TimedLoader(spec.loader, self)
+        return spec
+
+    def enter(self):
+        self.stack.append([time.perf_counter(), 0.0])
+
+    def exit(self, name):
+        started, children = self.stack.pop()
+        elapsed = time.perf_counter() - started
+        self.modules[name] = (elapsed - children, elapsed)
+        if self.stack:
+            self.stack[-1][1] += elapsed
+
+
+class StartupReport:
+    """Import times and startup phase durations for one process."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.imports = ImportTimer()
+        self.phases = []
+        os.register_at_fork(after_in_child=self._forked)
+
+    def track_imports(self):
+        """Time every import until `log_imports`; entry points that report
+        call this before importing anything else.
+        """
+        self.imports.install()
+
+    def _forked(self):
+        # A preloaded worker starts when it is forked, not with the master.
+        self.started = time.perf_counter()
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started))
+
+    def _logger(self):
+        from oguild.logs import Logger
+
+        return Logger("startup").get_logger()
+
+    def log_imports(self, top=15):
+        """Stop timing imports and log the slowest packages and modules."""
+        self.imports.uninstall()
+        modules = self.imports.modules
+        packages = defaultdict(float)
+        for name, (own, _) in modules.items():
+            packages[name.partition(".")[0]] += own
+        total = sum(own for own, _ in modules.values())
+
+        def ranked(items):
+            items = sorted(items, key=lambda item: item[1], reverse=True)
+            return ", ".join(
+                f"{name} {seconds * 1000:.1f}ms"
+                for name, seconds in items[:top]
+            )
+
+        logger = self._logger()
+        logger.info(
+            f"Imported {len(modules)} modules in {total * 1000:.0f}ms "
+            f"(process {os.getpid()})"
+        )
+        logger.info(f"Import time by package: {ranked(packages.items())}")
+        logger.info(
+            "Slowest modules (self): "
+            + ranked((name, own) for name, (own, _) in modules.items())
+        )
+
+    def log_phases(self):
+        phases = ", ".join(
+            f"{name} {seconds * 1000:.1f}ms" for name, seconds in self.phases
+        )
+        self._logger().info(
+            f"Worker {os.getpid()} ready "
+            f"{(time.perf_counter() - self.started) * 1000:.0f}ms after "
+            f"start: {phases}"
+        )
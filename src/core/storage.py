@@ -0,0 +1,305 @@
+import asyncio
+from contextlib import AsyncExitStack
+
+from decouple import config
+from fastapi.responses import StreamingResponse
+from oguild.logs import Logger
+from oguild.response import Error
+
+MiB = 1024 * 1024
+
+
+class Storage:
+    def __init__(self, endpoint_url=None, bucket=None):
+        self.endpoint_url = endpoint_url or self._get_endpoint_url()
+        self.public_endpoint_url = config(
+            "MINIO_PUBLIC_ENDPOINT", default=self.endpoint_url
+        )
+        self.bucket = bucket or config("MINIO_BUCKET_NAME", default="public")
+        self.access_key = config("MINIO_ACCESS_KEY", default="")
+        self.secret_key = config("MINIO_SECRET_KEY", default="")
+        self.part_size = config("STORAGE_PART_SIZE", default=8 * MiB, cast=int)
+        self.upload_concurrency = config(
+            "STORAGE_UPLOAD_CONCURRENCY", default=4, cast=int
+        )
+        self.chunk_size = config(
+            "STORAGE_CHUNK_SIZE", default=64 * 1024, cast=int
+        )
+        self.client = None
+        self.signer = None
+        self.logger = Logger("storage").get_logger()
+
+    def _get_endpoint_url(self):
+        endpoint = config("MINIO_ENDPOINT", default="minio:9000")
+        if "://" in endpoint:
+            return endpoint
+        secure = config("MINIO_SECURE", default=False, cast=bool)
+        return f"{'https' if secure else 'http'}://{endpoint}"
+
+    def _create_client(self, session, endpoint_url):
+        from aiobotocore.config import AioConfig
+
+        return session.create_client(
+            "s3",
+            endpoint_url=endpoint_url,
+            aws_access_key_id=self.access_key,
+            aws_secret_access_key=self.secret_key,
+            region_name=config("MINIO_REGION", default="us-east-1"),
+            config=AioConfig(
+                signature_version="s3v4",
+                s3={"addressing_style": "path"},
+                max_pool_connections=config(
+                    "STORAGE_MAX_CONNECTIONS", default=20, cast=int
+                ),
+            ),
+        )
+
+    async def initialize(self, retries=20, delay=20):
+        """Create the pooled S3 client on startup with retry logic."""
+        # Imported here so processes that never use storage skip the cost;
+        # the server warms it before forking workers.
+        from aiobotocore.session import get_session
+
+        session = get_session()
+        self._stack = AsyncExitStack()
+        self.client = await self._stack.enter_async_context(
+            self._create_client(session, self.endpoint_url)
+        )
+        self.signer = self.client
+        if self.public_endpoint_url != self.endpoint_url:
+            # Presigned URLs are bound to the host they were signed for, so
+            # they must be signed against the endpoint clients can reach.
+            self.signer = await self._stack.enter_async_context(
+                self._create_client(session, self.public_endpoint_url)
+            )
+
+        for attempt in range(1, retries + 1):
+            try:
+                await self._ensure_bucket()
+                self.logger.info("Storage client initialized.")
+                return
+            except Exception as e:
+                self.logger.warning(
+                    f"[Attempt {attempt}/{retries}] Storage not ready yet: {e}"
+                )
+            await asyncio.sleep(delay)
+
+        await self.close()
+        self.logger.critical("Storage initialization failed after retries.")
+        raise RuntimeError("Failed to initialize storage after retries.")
+
+    async def close(self):
+        """Close the S3 client on shutdown."""
+        if self.client:
+            await self._stack.aclose()
+            self.client = None
+            self.signer = None
+            self.logger.info("Storage client closed.")
+
+    async def _ensure_bucket(self):
+        try:
+            await self.client.head_bucket(Bucket=self.bucket)
+        except self.client.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] not in ("404", "NoSuchBucket"):
+                raise
+            await self.client.create_bucket(Bucket=self.bucket)
+            self.logger.info(f"Created bucket {self.bucket}.")
+
+    async def upload_stream(
+        self, key, chunks, content_type="application/octet-stream"
+    ):
+        """Stream an async iterable of bytes into the bucket.
+
+        At most `upload_concurrency + 1` parts are held in memory at once,
+        so memory stays bounded regardless of the object size.
+        """
+        buffer = bytearray()
+        upload_id = None
+        uploads = []
+        slots = asyncio.Semaphore(self.upload_concurrency)
+        size = 0
+
+        try:
+            async for chunk in chunks:
+                buffer.extend(chunk)
+                size += len(chunk)
+                while len(buffer) >= self.part_size:
+                    if upload_id is None:
+                        upload = await self.client.create_multipart_upload(
+                            Bucket=self.bucket,
+                            Key=key,
+                            ContentType=content_type,
+                        )
+                        upload_id = upload["UploadId"]
+                    body = bytes(buffer[: self.part_size])
+                    del buffer[: self.part_size]
+                    await slots.acquire()
+                    self._raise_failed_part(uploads)
+                    uploads.append(
+                        asyncio.create_task(
+                            self._upload_part(
+                                key, upload_id, len(uploads) + 1, body, slots
+                            )
+                        )
+                    )
+
+            if upload_id is None:
+                response = await self.client.put_object(
+                    Bucket=self.bucket,
+                    Key=key,
+                    Body=bytes(buffer),
+                    ContentType=content_type,
+                )
+                return {"key": key, "size": size, "etag": response["ETag"]}
+
+            if buffer:
+                await slots.acquire()
+                self._raise_failed_part(uploads)
+                uploads.append(
+                    asyncio.create_task(
+                        self._upload_part(
+                            key,
+                            upload_id,
+                            len(uploads) + 1,
+                            bytes(buffer),
+                            slots,
+                        )
+                    )
+                )
+                buffer.clear()
+
+            parts = await asyncio.gather(*uploads)
+            response = await self.client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+                MultipartUpload={"Parts": parts},
+            )
+            return {"key": key, "size": size, "etag": response["ETag"]}
+        except BaseException:
+            for upload in uploads:
+                upload.cancel()
+            if upload_id is not None:
+                await asyncio.gather(*uploads, return_exceptions=True)
+                await self.client.abort_multipart_upload(
+                    Bucket=self.bucket, Key=key, UploadId=upload_id
+                )
+                self.logger.warning(f"Aborted multipart upload of {key}.")
+            raise
+
+    def _raise_failed_part(self, uploads):
+        """Abort early, without reading the rest of the body, once any part
+        has failed.
+        """
+        for upload in uploads:
+            if upload.done() and not upload.cancelled():
+                error = upload.exception()
+                if error is not None:
+                    raise error
+
+    async def _upload_part(self, key, upload_id, part_number, body, slots):
+        try:
+            response = await self.client.upload_part(
+                Bucket=self.bucket,
+                Key=key,
+                UploadId=upload_id,
+                PartNumber=part_number,
+                Body=body,
+            )
+            return {"PartNumber": part_number, "ETag": response["ETag"]}
+        finally:
+            slots.release()
+
+    async def download_stream(self, key, byte_range=None):
+        """Return the object metadata and an async iterator over its bytes.
+
+        `byte_range` is an HTTP Range header value such as `bytes=0-1023`.
+        """
+        params = {"Bucket": self.bucket, "Key": key}
+        if byte_range:
+            params["Range"] = byte_range
+        response = await self.client.get_object(**params)
+        body = response.pop("Body")
+
+        async def iter_body():
+            try:
+                while chunk := await body.read(self.chunk_size):
+                    yield chunk
+            finally:
+                body.close()
+
+        return response, iter_body()
+
+    async def stream_response(self, key, range_header=None):
+        """Build a StreamingResponse for an object, honouring Range."""
+        try:
+            response, chunks = await self.download_stream(key, range_header)
+        except self.client.exceptions.ClientError as e:
+            code = e.response["Error"]["Code"]
+            if code in ("NoSuchKey", "404"):
+                raise Error("File not found", 404)
+            if code == "InvalidRange":
+                raise Error("Requested range not satisfiable", 416)
+            raise
+
+        headers = {
+            "Accept-Ranges": "bytes",
+            "Content-Length": str(response["ContentLength"]),
+            "ETag": response["ETag"],
+        }
+        status_code = 200
+        if response.get("ContentRange"):
+            headers["Content-Range"] = response["ContentRange"]
+            status_code = 206
+
+        return StreamingResponse(
+            chunks,
+            status_code=status_code,
+            media_type=response.get("ContentType"),
+            headers=headers,
+        )
+
+    async def presigned_url(self, key, method="get", expires=3600):
+        """Generate a presigned URL so clients transfer directly with MinIO."""
+        operations = {"get": "get_object", "put": "put_object"}
+        if method not in operations:
+            raise ValueError(f"Unsupported presign method: {method}")
+        return await self.signer.generate_presigned_url(
+            operations[method],
+            Params={"Bucket": self.bucket, "Key": key},
+            ExpiresIn=expires,
+        )
+
+    async def head(self, key):
+        """Return object metadata, or None if the object does not exist."""
+        try:
+            return await self.client.head_object(Bucket=self.bucket, Key=key)
+        except self.client.exceptions.ClientError as e:
+            if e.response["Error"]["Code"] in ("NoSuchKey", "404"):
+                return None
+            raise
+
+    async def delete(self, key):
+        """Delete an object from the bucket."""
+        await self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    async def list(self, prefix=""):
+        """Return the keys under `prefix`, sorted."""
+        keys = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        pages = paginator.paginate(Bucket=self.bucket, Prefix=prefix)
+        async for page in pages:
+            keys.extend(item["Key"] for item in page.get("Contents", []))
+        return sorted(keys)
+
+    async def put_bytes(self, key, data, content_type="application/json"):
+        """Store a small object in one request."""
+        await self.client.put_object(
+            Bucket=self.bucket, Key=key, Body=data, ContentType=content_type
+        )
+
+    async def get_bytes(self, key):
+        """Read a small object fully into memory."""
+        response = await self.client.get_object(Bucket=self.bucket, Key=key)
+        async with response["Body"] as body:
+            return await body.read()
@@ -1,16 +1,27 @@
+from src import startup
+
+# Before anything else is imported so every import is timed.
+startup.track_imports()
+
 import os
 from contextlib import asynccontextmanager
 
-import uvicorn
 from decouple import config
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Header, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from oguild.middleware import ErrorMiddleware
 from oguild.log import logger
-from src import database
+from src import database, profiler, queue, rate_limiter, storage
+from src.core.profiler import ProfilerMiddleware
+from src.core.query_budget import Budget, QueryBudgetMiddleware
+from src.core.ratelimit import (
+    ConcurrencyLimitMiddleware,
+    Policy,
+    RateLimitMiddleware,
+)
 
 env = config("ENV", default="prod")
 is_prod = env == "prod"
@@ -18,11 +29,24 @@ is_prod = env == "prod"
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await database.initialize()
+    with startup.phase("rate_limiter"):
+        await rate_limiter.initialize()
+    await profiler.initialize(rate_limiter.redis)
+    with startup.phase("database"):
+        await database.initialize()
+    with startup.phase("queue"):
+        await queue.initialize()
+    with startup.phase("storage"):
+        await storage.initialize()
+    startup.log_phases()
     logger.info(f"Application started for process {os.getpid()}")
 
     yield
+    await storage.close()
+    await queue.close()
     await database.close()
+    await profiler.close()
+    await rate_limiter.close()
     logger.info(f"Application stopped for process {os.getpid()}")
 
 
@@ -53,12 +77,40 @@ async def add_trailing_slash_middleware(request: Request, call_next):
     return response
 
 
+# Added before CORS so that CORS wraps their 429/503 responses and browsers
+# can read them, but still ahead of the handler and any database access.
+app.add_middleware(
+    ConcurrencyLimitMiddleware,
+    # One slot per pooled connection, so requests wait here with a
+    # deadline rather than in pool.acquire().
+    max_in_flight=config(
+        "MAX_IN_FLIGHT", default=database.max_size, cast=int
+    ),
+    max_waiting=config("MAX_WAITING", default=100, cast=int),
+    wait_timeout=config("MAX_WAIT_SECONDS", default=0.5, cast=float),
+    exempt=("/api/v1/ping",),
+)
+
+app.add_middleware(
+    RateLimitMiddleware,
+    limiter=rate_limiter,
+    default=Policy.parse(config("RATE_LIMIT_DEFAULT", default="300/minute")),
+    routes={},
+    exempt=("/api/v1/ping",),
+)
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=[config("ALLOWED_ORIGINS", default="*").split(",")],
+    allow_origins=config("ALLOWED_ORIGINS", default="*").split(","),
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "Retry-After",
+        "X-RateLimit-Limit",
+        "X-RateLimit-Remaining",
+        "Server-Timing",
+    ],
 )
 
 app.add_middleware(
@@ -70,13 +122,45 @@ app.add_middleware(
 
 app.add_middleware(SessionMiddleware, secret_key=config("SECRET_KEY"))
 
+# Budgets warn in production; QUERY_BUDGET_STRICT=True makes tests fail.
+app.add_middleware(
+    QueryBudgetMiddleware,
+    default=Budget(
+        max_queries=config("QUERY_BUDGET_MAX_QUERIES", default=50, cast=int),
+        max_db_ms=config("QUERY_BUDGET_MAX_DB_MS", default=0, cast=int)
+        or None,
+        max_repeats=config("QUERY_BUDGET_MAX_REPEATS", default=10, cast=int),
+    ),
+    routes={},
+    strict=config("QUERY_BUDGET_STRICT", default=False, cast=bool),
+)
+
+# Outermost, so profiled requests include time spent in every middleware.
+app.add_middleware(ProfilerMiddleware, profiler=profiler)
+
 @app.get("/api/v1/ping/")
 async def health_check():
     return {"status": "ok"}
 
 
+@app.post("/api/v1/admin/profile/")
+async def profile_worker(
+    seconds: float = Query(10, gt=0, le=60),
+    format: str = Query("json", pattern="^(json|collapsed)$"),
+    x_admin_token: str = Header(None),
+):
+    """Sample every request this worker serves for `seconds`."""
+    profiler.authorize_admin(x_admin_token)
+    profile, path = await profiler.profile_worker(seconds)
+    if format == "collapsed":
+        return PlainTextResponse(profile.collapsed())
+    return {"pid": os.getpid(), "path": path.name, **profile.summary()}
+
+startup.log_imports()
+
+
 if __name__ == "__main__":
+    from src.server import main
+
     logger.info("Starting the server")
-    port = int(config("APP_PORT", default=8000))
-    reload = False if is_prod else True
-    uvicorn.run("main:app", host="0.0.0.0", port=port, reload=reload)
+    main()
@@ -0,0 +1,316 @@
+import importlib.util
+import math
+import os
+import random
+import signal
+import socket
+import sys
+import time
+
+import uvicorn
+from decouple import config
+from oguild.log import logger
+from uvicorn.importer import import_from_string
+
+APP = "src.main:app"
+
+# Client libraries the app imports on first use. With preload they are
+# imported before forking so workers inherit them instead of paying for
+# them in every lifespan.
+WARM_IMPORTS = ("aiobotocore.session", "aiobotocore.config", "redis.asyncio")
+
+
+def cpu_quota():
+    """CPUs granted by the container's cgroup quota, or None if unlimited."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as cpu_max:
+            quota, period = cpu_max.read().split()[:2]
+    except (OSError, ValueError):
+        try:
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as cfs_quota:
+                quota = cfs_quota.read().strip()
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as cfs_period:
+                period = cfs_period.read().strip()
+        except OSError:
+            return None
+    if quota in ("max", "-1"):
+        return None
+    return max(1, math.ceil(int(quota) / int(period)))
+
+
+def default_workers(pool_size=20, connection_budget=80):
+    """One worker per available CPU, capped by the connection budget.
+
+    Every worker opens its own database pool, so workers times the pool's
+    max size must stay within what Postgres allows for this app.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = cpu_quota()
+    if quota:
+        cpus = min(cpus, quota)
+    return max(1, min(cpus, connection_budget // pool_size))
+
+
+def reserved_connections():
+    """Connections the budget keeps for the queue worker and backups."""
+    worker_pool = config("WORKER_DB_POOL_MAX_SIZE", default=5, cast=int)
+    # pg_dump --jobs=N opens one connection per job plus a coordinator.
+    backup = config("BACKUP_JOBS", default=4, cast=int) + 1
+    return worker_pool + backup
+
+
+def rss_mb():
+    """Current resident set size of this process in MiB."""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return 0
+
+
+class WorkerServer(uvicorn.Server):
+    """Uvicorn server that also exits gracefully above a memory threshold."""
+
+    def __init__(self, config, max_memory_mb=0):
+        super().__init__(config)
+        self.max_memory_mb = max_memory_mb
+
+    async def on_tick(self, counter):
+        if self.max_memory_mb and counter % 50 == 0:
+            memory = rss_mb()
+            if memory > self.max_memory_mb:
+                logger.info(
+                    f"Worker {os.getpid()} using {memory:.0f}MiB "
+                    f"(limit {self.max_memory_mb}MiB), recycling."
+                )
+                self.should_exit = True
+        return await super().on_tick(counter)
+
+
+class Supervisor:
+    """Pre-fork process manager for the uvicorn workers.
+
+    The app is imported once in the master and inherited by forked workers
+    (preload), workers share one listening socket, and each worker is
+    recycled after a jittered request count or a memory threshold so that
+    workers restart one at a time rather than all at once.
+    """
+
+    def __init__(
+        self,
+        app=APP,
+        host="0.0.0.0",
+        port=8000,
+        workers=None,
+        max_requests=10000,
+        max_requests_jitter=1000,
+        max_memory_mb=0,
+        preload=True,
+        timeout_keep_alive=60,
+        timeout_graceful_shutdown=500,
+        forwarded_allow_ips="127.0.0.1",
+    ):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers or default_workers()
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.max_memory_mb = max_memory_mb
+        self.preload = preload
+        self.timeout_keep_alive = timeout_keep_alive
+        self.timeout_graceful_shutdown = timeout_graceful_shutdown
+        self.forwarded_allow_ips = forwarded_allow_ips
+        self.children = {}
+        self.stopping = False
+        self.restarting = []
+
+    def uvicorn_config(self):
+        loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+        http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+        max_requests = None
+        if self.max_requests:
+            max_requests = self.max_requests + random.randint(
+                0, self.max_requests_jitter
+            )
+        return uvicorn.Config(
+            self.app,
+            loop=loop,
+            http=http,
+            timeout_keep_alive=self.timeout_keep_alive,
+            timeout_graceful_shutdown=self.timeout_graceful_shutdown,
+            limit_max_requests=max_requests,
+            proxy_headers=True,
+            forwarded_allow_ips=self.forwarded_allow_ips,
+        )
+
+    def bind(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        return sock
+
+    def run(self):
+        if self.preload:
+            started = time.perf_counter()
+            self.app = import_from_string(self.app)
+            for name in WARM_IMPORTS:
+                importlib.import_module(name)
+            logger.info(
+                f"Preloaded the app in {time.perf_counter() - started:.2f}s"
+            )
+
+        self.socket = self.bind()
+        logger.info(
+            f"Supervisor {os.getpid()} listening on {self.host}:{self.port} "
+            f"with {self.workers} workers"
+        )
+
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+        signal.signal(signal.SIGHUP, self.handle_reload)
+
+        for index in range(self.workers):
+            self.spawn(index)
+
+        while self.children:
+            self.reap()
+            if not self.stopping:
+                self.roll()
+            time.sleep(0.5)
+
+        self.socket.close()
+        logger.info(f"Supervisor {os.getpid()} stopped")
+
+    def spawn(self, index):
+        pid = os.fork()
+        if pid:
+            self.children[pid] = (index, time.monotonic())
+            return
+
+        # Child: restore default signal handling; uvicorn installs its own.
+        for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(sig, signal.SIG_DFL)
+        random.seed()
+        code = 0
+        try:
+            server = WorkerServer(self.uvicorn_config(), self.max_memory_mb)
+            server.run(sockets=[self.socket])
+            if not server.started:
+                code = 3
+        except BaseException as e:
+            logger.error(f"Worker {os.getpid()} crashed: {e}")
+            code = 1
+        finally:
+            os._exit(code)
+
+    def reap(self):
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                return
+            if pid == 0:
+                return
+
+            index, started = self.children.pop(pid)
+            code = os.waitstatus_to_exitcode(status)
+            if self.stopping:
+                continue
+
+            uptime = time.monotonic() - started
+            logger.info(
+                f"Worker {pid} exited with code {code} after {uptime:.0f}s, "
+                "starting a replacement"
+            )
+            if code not in (0, -signal.SIGTERM) and uptime < 5:
+                # Avoid a hot crash loop when startup keeps failing.
+                time.sleep(1)
+            self.spawn(index)
+
+    def roll(self):
+        """Restart workers queued by SIGHUP one at a time."""
+        if not self.restarting or len(self.children) < self.workers:
+            return
+        youngest = max(started for _, started in self.children.values())
+        if time.monotonic() - youngest < 5:
+            # Give the previous replacement time to finish its startup.
+            return
+        pid = self.restarting.pop()
+        if pid in self.children:
+            os.kill(pid, signal.SIGTERM)
+
+    def handle_reload(self, signum, frame):
+        logger.info("Received SIGHUP, rolling restart of workers")
+        self.restarting = list(self.children)
+
+    def handle_stop(self, signum, frame):
+        if self.stopping:
+            return
+        self.stopping = True
+        logger.info(f"Received {signal.Signals(signum).name}, stopping")
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+
+def main():
+    env = config("ENV", default="prod")
+    port = config("APP_PORT", default=8000, cast=int)
+    # Proxies whose X-Forwarded-For is trusted for the client address.
+    forwarded_allow_ips = config("FORWARDED_ALLOW_IPS", default="127.0.0.1")
+
+    if env != "prod" and config("RELOAD", default=True, cast=bool):
+        uvicorn.run(
+            APP,
+            host="0.0.0.0",
+            port=port,
+            reload=True,
+            forwarded_allow_ips=forwarded_allow_ips,
+        )
+        return
+
+    pool_size = config("DB_POOL_MAX_SIZE", default=20, cast=int)
+    # The budget covers every process using the database, so the web
+    # workers get what is left after the queue worker and backups.
+    connection_budget = (
+        config("DB_CONNECTION_BUDGET", default=90, cast=int)
+        - reserved_connections()
+    )
+    workers = config("WEB_CONCURRENCY", default=0, cast=int)
+    if workers and workers * pool_size > connection_budget:
+        logger.warning(
+            f"WEB_CONCURRENCY={workers} with DB_POOL_MAX_SIZE={pool_size} "
+            f"may open more than the {connection_budget} database "
+            "connections DB_CONNECTION_BUDGET leaves for web workers"
+        )
+
+    Supervisor(
+        host=config("HOST", default="0.0.0.0"),
+        port=port,
+        workers=workers or default_workers(pool_size, connection_budget),
+        max_requests=config("MAX_REQUESTS", default=10000, cast=int),
+        max_requests_jitter=config(
+            "MAX_REQUESTS_JITTER", default=1000, cast=int
+        ),
+        max_memory_mb=config("MAX_WORKER_MEMORY_MB", default=0, cast=int),
+        preload=config("PRELOAD_APP", default=True, cast=bool),
+        timeout_keep_alive=config("TIMEOUT_KEEP_ALIVE", default=60, cast=int),
+        timeout_graceful_shutdown=config(
+            "TIMEOUT_GRACEFUL_SHUTDOWN", default=500, cast=int
+        ),
+        forwarded_allow_ips=forwarded_allow_ips,
+    ).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
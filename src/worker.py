@@ -0,0 +1,57 @@
+from src import startup
+
+# Before anything else is imported so every import is timed.
+startup.track_imports()
+
+import asyncio
+import importlib
+import os
+import signal
+
+from decouple import config
+from oguild.log import logger
+from src import database, queue
+from src.core.queue import Worker
+
+
+async def main():
+    for module in config("TASK_MODULES", default="").split(","):
+        if module.strip():
+            importlib.import_module(module.strip())
+    startup.log_imports()
+
+    # The queue worker gets its own, smaller share of DB_CONNECTION_BUDGET.
+    database.max_size = config("WORKER_DB_POOL_MAX_SIZE", default=5, cast=int)
+    database.min_size = min(database.min_size, database.max_size)
+    with startup.phase("database"):
+        await database.initialize()
+    with startup.phase("queue"):
+        await queue.initialize()
+    startup.log_phases()
+
+    worker = Worker(
+        queue,
+        concurrency=config("WORKER_CONCURRENCY", default=10, cast=int),
+        poll_interval=config("WORKER_POLL_INTERVAL", default=1.0, cast=float),
+        visibility_timeout=config(
+            "WORKER_VISIBILITY_TIMEOUT", default=60, cast=int
+        ),
+    )
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+
+    logger.info(
+        f"Worker started for process {os.getpid()} "
+        f"with {len(queue.tasks)} tasks"
+    )
+    try:
+        await worker.run()
+    finally:
+        await queue.close()
+        await database.close()
+        logger.info(f"Worker stopped for process {os.getpid()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
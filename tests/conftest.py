@@ -0,0 +1,27 @@
+import fakeredis
+import pytest
+
+from src.core import queue as queue_module
+from src.core.queue import MemoryBackend, RedisBackend
+
+
+@pytest.fixture
+def redis_server(monkeypatch):
+    """Point RedisBackend at an in-process fakeredis server with Lua."""
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        queue_module,
+        "create_redis",
+        lambda redis_url=None, **kwargs: fakeredis.FakeAsyncRedis(
+            server=server
+        ),
+    )
+    return server
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request):
+    if request.param == "memory":
+        return MemoryBackend()
+    request.getfixturevalue("redis_server")
+    return RedisBackend(prefix="test")
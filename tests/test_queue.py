@@ -0,0 +1,211 @@
+import asyncio
+import time
+
+from src.core.queue import Queue, RedisBackend, Worker
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def connected(backend):
+    queue = Queue(backend=backend, result_ttl=60)
+    await queue.initialize(retries=1, delay=0)
+    return queue
+
+
+async def drain(queue, job_ids, timeout=5, **kwargs):
+    """Run a worker until every job has finished."""
+    worker = Worker(queue, poll_interval=0.01, **kwargs)
+    runner = asyncio.create_task(worker.run())
+    try:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            jobs = [await queue.get_job(job_id) for job_id in job_ids]
+            if all(job["status"] in ("complete", "failed") for job in jobs):
+                return jobs
+            await asyncio.sleep(0.01)
+        raise AssertionError(f"jobs did not finish: {jobs}")
+    finally:
+        worker.stop()
+        await runner
+
+
+def test_pop_follows_priority_order(backend):
+    async def scenario():
+        queue = await connected(backend)
+
+        @queue.task(name="noop")
+        async def noop():
+            pass
+
+        low = await queue.enqueue("noop", priority="low")
+        default = await queue.enqueue("noop")
+        high = await queue.enqueue("noop", priority="high")
+
+        popped = [(await backend.pop(0.1))["id"] for _ in range(3)]
+        assert popped == [high, default, low]
+        assert await backend.pop(0.01) is None
+        await queue.close()
+
+    run(scenario())
+
+
+def test_delayed_jobs_are_promoted_when_due(backend):
+    async def scenario():
+        queue = await connected(backend)
+
+        @queue.task(name="noop")
+        async def noop():
+            pass
+
+        job_id = await queue.enqueue("noop", delay=30)
+        assert (await queue.get_job(job_id))["status"] == "scheduled"
+
+        await backend.promote(time.time())
+        assert await backend.pop(0.01) is None
+
+        await backend.promote(time.time() + 31)
+        assert (await backend.pop(0.1))["id"] == job_id
+        await queue.close()
+
+    run(scenario())
+
+
+def test_worker_retries_with_backoff_then_succeeds(backend):
+    async def scenario():
+        queue = await connected(backend)
+        calls = []
+
+        @queue.task(name="flaky", max_retries=3, retry_delay=0.05)
+        async def flaky(value):
+            calls.append(time.monotonic())
+            if len(calls) < 3:
+                raise ValueError("not yet")
+            return value * 2
+
+        job_id = await queue.enqueue("flaky", args=(21,))
+        [job] = await drain(queue, [job_id])
+
+        assert job["status"] == "complete"
+        assert job["result"] == 42
+        assert job["attempts"] == 3
+        # Backoff doubles: 0.05s before the second call, 0.1s before the third.
+        assert calls[1] - calls[0] >= 0.05
+        assert calls[2] - calls[1] >= 0.1
+        await queue.close()
+
+    run(scenario())
+
+
+def test_worker_fails_job_after_max_retries(backend):
+    async def scenario():
+        queue = await connected(backend)
+
+        @queue.task(name="broken", max_retries=1, retry_delay=0.01)
+        def broken():
+            raise RuntimeError("boom")
+
+        job_id = await queue.enqueue("broken")
+        [job] = await drain(queue, [job_id])
+
+        assert job["status"] == "failed"
+        assert job["attempts"] == 2
+        assert "boom" in job["error"]
+        await queue.close()
+
+    run(scenario())
+
+
+def test_redis_acked_jobs_leave_processing(redis_server):
+    async def scenario():
+        backend = RedisBackend(prefix="test")
+        queue = await connected(backend)
+
+        @queue.task(name="noop")
+        async def noop():
+            return "done"
+
+        job_id = await queue.enqueue("noop")
+        [job] = await drain(queue, [job_id])
+
+        assert job["result"] == "done"
+        assert await backend.redis.zcard(backend.processing_key) == 0
+        await queue.close()
+
+    run(scenario())
+
+
+def test_redis_requeues_jobs_abandoned_by_a_dead_worker(redis_server):
+    async def scenario():
+        backend = RedisBackend(prefix="test")
+        queue = await connected(backend)
+
+        @queue.task(name="noop")
+        async def noop():
+            pass
+
+        job_id = await queue.enqueue("noop")
+        # A worker pops the job and dies without acking it.
+        job = await backend.pop(0.1, visibility_timeout=10)
+        job["attempts"] = 1
+        await backend.save(job)
+        assert await backend.redis.zcard(backend.processing_key) == 1
+
+        assert await backend.promote(time.time()) == []
+        assert await backend.pop(0.01) is None
+
+        assert await backend.promote(time.time() + 11) == []
+        assert (await backend.pop(0.1))["id"] == job_id
+        await queue.close()
+
+    run(scenario())
+
+
+def test_redis_fails_abandoned_jobs_without_retries_left(redis_server):
+    async def scenario():
+        backend = RedisBackend(prefix="test")
+        queue = await connected(backend)
+
+        @queue.task(name="noop", max_retries=0)
+        async def noop():
+            pass
+
+        job_id = await queue.enqueue("noop")
+        job = await backend.pop(0.1, visibility_timeout=10)
+        job["attempts"] = 1
+        await backend.save(job)
+
+        assert await backend.promote(time.time() + 11) == [job_id]
+        assert await backend.redis.zcard(backend.processing_key) == 0
+        assert await backend.pop(0.01) is None
+
+        worker = Worker(queue)
+        await worker._abandoned(job_id)
+        assert (await queue.get_job(job_id))["status"] == "failed"
+        await queue.close()
+
+    run(scenario())
+
+
+def test_redis_touch_extends_running_jobs(redis_server):
+    async def scenario():
+        backend = RedisBackend(prefix="test")
+        queue = await connected(backend)
+
+        @queue.task(name="noop")
+        async def noop():
+            pass
+
+        job_id = await queue.enqueue("noop")
+        job = await backend.pop(0.1, visibility_timeout=10)
+        await backend.touch([job], time.time() + 60)
+
+        assert await backend.promote(time.time() + 11) == []
+        await backend.ack(job)
+        assert await backend.promote(time.time() + 61) == []
+        assert await backend.pop(0.01) is None
+        assert (await queue.get_job(job_id))["status"] == "queued"
+        await queue.close()
+
+    run(scenario())